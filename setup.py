@@ -33,8 +33,12 @@ setup(
     python_requires=">=3.9",
     install_requires=[
         "requests>=2.31.0",
+        "urllib3>=1.26.0",  # Retry(allowed_methods=...) só existe a partir do urllib3 1.26
     ],
     extras_require={
+        "fast": [
+            "orjson>=3.8.0",
+        ],
         "dev": [
             "pytest>=7.0.0",
             "pytest-cov>=4.0.0",
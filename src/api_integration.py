@@ -8,9 +8,57 @@ especificamente a API do World Bank para dados de desenvolvimento mundial.
 """
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
+from types import MappingProxyType
+import hashlib
 import json
+import os
+import threading
+import time
+
+try:
+    import orjson  # Decodificador JSON nativo (opcional), bem mais rápido que o json padrão
+except ImportError:
+    orjson = None
+
+
+def _latest_with_value(records: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Retorna o registro mais recente (maior 'date') que possui valor, em uma única passada.
+    """
+    return max(
+        (d for d in records if d.get('value') is not None),
+        key=lambda x: x.get('date') or '',
+        default=None
+    )
+
+
+def _copy_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia um registro da API, incluindo os campos aninhados (ex: 'country', 'indicator'),
+    para que o chamador possa alterá-lo sem corromper a resposta mantida em cache.
+    """
+    return {k: dict(v) if isinstance(v, dict) else v for k, v in record.items()}
+
+
+def _copy_records(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copia uma lista de registros da API (ver _copy_record)."""
+    return [_copy_record(r) for r in records]
+
+
+def _label(record: Dict[str, Any], key: str) -> str:
+    """
+    Retorna o rótulo de um campo aninhado da API (ex: record['country']['value']),
+    ou '' se ausente, sem alocar dicionários vazios como valor padrão.
+    """
+    nested = record.get(key)
+    return nested.get('value', '') if nested else ''
 
 
 class WorldBankAPIIntegration:
@@ -19,12 +67,156 @@ class WorldBankAPIIntegration:
     """
     
     BASE_URL = "https://api.worldbank.org/v2"
+    COUNTRIES_URL = BASE_URL + "/country"
+    INDICATORS_URL = BASE_URL + "/indicator"
+    COUNTRY_INDICATOR_URL = BASE_URL + "/country/{countries}/indicator/{indicator}"
+    # Parâmetros fixos das séries de indicadores (somente leitura; copiar antes de alterar)
+    _SERIES_PARAMS = MappingProxyType({'format': 'json', 'per_page': 100})
+    MAX_WORKERS = 16  # Limite de requisições simultâneas nas consultas em lote
+    TIMEOUT = (3.05, 10)  # (conexão, leitura) em segundos: falha rápido se o host não responder
+    CACHE_TTL = 3600  # Validade (segundos) das respostas em cache para dados de indicadores
+    COUNTRIES_CACHE_TTL = 86400  # A lista de países é praticamente estática
+    CACHE_MAXSIZE = 1024  # Número máximo de respostas mantidas em cache
+    SEARCH_PAGE_SIZE = 1000  # Tamanho de página usado em buscas e consultas em lote
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: Diretório para persistir as respostas em disco entre execuções
+                (opcional; por padrão o cache fica apenas em memória)
+        """
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'DataMeshFramework/1.0'
         })
+        
+        # Pool de conexões dimensionado para as consultas em paralelo e retry
+        # automático para falhas transitórias do servidor (com backoff exponencial)
+        retry = Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"]
+        )
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=retry)
+        self.session.mount('https://', adapter)
+        
+        # Cache em memória com TTL para as respostas de GET (idempotentes)
+        self._cache: Dict[tuple, tuple] = {}  # chave -> (expira_em, dados, etag)
+        self._inflight: Dict[tuple, Future] = {}  # chave -> requisição em andamento
+        self._cache_lock = threading.Lock()
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    def _disk_cache_path(self, key: tuple) -> str:
+        """Caminho do arquivo de cache em disco para uma chave (url, params)."""
+        digest = hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+    
+    def _read_disk_cache(self, key: tuple, ttl: float) -> Optional[tuple]:
+        """
+        Lê uma resposta persistida em disco se ela ainda estiver dentro do TTL.
+        
+        Returns:
+            Tupla (dados, etag) ou None se não houver entrada válida
+        """
+        path = self._disk_cache_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) >= ttl:
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            return entry['data'], entry.get('etag')
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _write_disk_cache(self, key: tuple, data: Any, etag: Optional[str]) -> None:
+        """Persiste uma resposta em disco (escrita atômica via arquivo temporário)."""
+        path = self._disk_cache_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'data': data, 'etag': etag}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"✗ Erro ao gravar cache em disco: {e}")
+    
+    def _get_json(self, url: str, params: Dict[str, Any], ttl: float) -> Any:
+        """
+        Executa um GET e retorna o JSON decodificado, reutilizando respostas em cache
+        enquanto não expirarem. Respostas expiradas com ETag são revalidadas com um
+        GET condicional (If-None-Match); um 304 renova a entrada sem novo download.
+        Chamadas simultâneas para a mesma URL compartilham uma única requisição.
+        Com cache_dir configurado, respostas válidas também são lidas/gravadas em disco.
+        Erros HTTP são propagados para o chamador.
+        
+        O objeto retornado é compartilhado com o cache (e com chamadas simultâneas):
+        os métodos públicos devolvem cópias dos registros em vez de expô-lo.
+        """
+        key = (url, tuple(sorted(params.items())))
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+            pending = self._inflight.get(key)
+            if pending is None:
+                future = self._inflight[key] = Future()
+        
+        if pending is not None:
+            # Outra thread já está buscando esta URL: aguardar o mesmo resultado
+            return pending.result()
+        
+        try:
+            on_disk = self._read_disk_cache(key, ttl) if self.cache_dir else None
+            if on_disk:
+                data, etag = on_disk
+            else:
+                headers = {'If-None-Match': cached[2]} if cached and cached[2] else None
+                response = self.session.get(url, params=params, timeout=self.TIMEOUT, headers=headers)
+                if headers and response.status_code == 304:
+                    data, etag = cached[1], cached[2]
+                else:
+                    response.raise_for_status()
+                    data = self._decode_json(response)
+                    etag = response.headers.get('ETag')
+                if self.cache_dir:
+                    self._write_disk_cache(key, data, etag)
+            
+            with self._cache_lock:
+                self._cache.pop(key, None)
+                if len(self._cache) >= self.CACHE_MAXSIZE:
+                    # Remove a entrada mais antiga (dicts preservam a ordem de inserção)
+                    self._cache.pop(next(iter(self._cache)))
+                self._cache[key] = (now + ttl, data, etag)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cache_lock:
+                self._inflight.pop(key, None)
+    
+    @staticmethod
+    def _decode_json(response: requests.Response) -> Any:
+        """
+        Decodifica o corpo JSON da resposta (via orjson, se disponível). Corpos inválidos
+        (ex: página de erro HTML, payload truncado) levantam requests.exceptions.JSONDecodeError
+        nos dois caminhos, tratada pelos métodos públicos como as demais RequestException.
+        """
+        if orjson is None:
+            return response.json()
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from e
+    
+    def clear_cache(self) -> None:
+        """Descarta todas as respostas armazenadas em cache."""
+        with self._cache_lock:
+            self._cache.clear()
     
     def get_countries(self, per_page: int = 50) -> List[Dict[str, Any]]:
         """
@@ -37,18 +229,15 @@ class WorldBankAPIIntegration:
             Lista de países com seus metadados
         """
         try:
-            url = f"{self.BASE_URL}/country"
+            url = self.COUNTRIES_URL
             params = {
                 'format': 'json',
                 'per_page': per_page
             }
             
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._get_json(url, params, ttl=self.COUNTRIES_CACHE_TTL)
             if len(data) > 1:
-                countries = data[1]
+                countries = _copy_records(data[1] or [])
                 print(f"✓ {len(countries)} países recuperados da API do World Bank")
                 return countries
             
@@ -62,38 +251,59 @@ class WorldBankAPIIntegration:
         """
         Obtém lista de indicadores do World Bank.
         
+        Com search_term, percorre o catálogo completo em páginas grandes até
+        reunir per_page indicadores cujo nome contenha o termo.
+        
         Args:
             search_term: Termo de busca para filtrar indicadores
-            per_page: Número de resultados por página
+            per_page: Número de resultados por página (máximo de resultados na busca)
             
         Returns:
             Lista de indicadores disponíveis
         """
         try:
-            url = f"{self.BASE_URL}/indicator"
-            params = {
-                'format': 'json',
-                'per_page': per_page
-            }
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
+            url = self.INDICATORS_URL
+            if not search_term:
+                params = {
+                    'format': 'json',
+                    'per_page': per_page
+                }
+                
+                data = self._get_json(url, params, ttl=self.CACHE_TTL)
+                if len(data) > 1:
+                    indicators = _copy_records(data[1] or [])
+                    print(f"✓ {len(indicators)} indicadores recuperados da API do World Bank")
+                    return indicators
+                
+                return []
             
-            data = response.json()
-            if len(data) > 1:
-                indicators = data[1]
+            # Buscar em todas as páginas: filtrar apenas a primeira página perdia
+            # indicadores que não estavam entre os per_page primeiros do catálogo
+            term = search_term.lower()
+            indicators = []
+            page = 1
+            while len(indicators) < per_page:
+                params = {
+                    'format': 'json',
+                    'per_page': self.SEARCH_PAGE_SIZE,
+                    'page': page
+                }
+                data = self._get_json(url, params, ttl=self.CACHE_TTL)
+                if len(data) < 2 or not data[1]:
+                    break
                 
-                # Filtrar por termo de busca se fornecido
-                if search_term:
-                    indicators = [
-                        ind for ind in indicators 
-                        if search_term.lower() in ind.get('name', '').lower()
-                    ]
+                # Interromper a varredura da página assim que houver resultados suficientes
+                indicators.extend(islice(
+                    (_copy_record(ind) for ind in data[1] if term in (ind.get('name') or '').lower()),
+                    per_page - len(indicators)
+                ))
                 
-                print(f"✓ {len(indicators)} indicadores recuperados da API do World Bank")
-                return indicators
+                if page >= int(data[0].get('pages') or 1):
+                    break
+                page += 1
             
-            return []
+            print(f"✓ {len(indicators)} indicadores recuperados da API do World Bank")
+            return indicators
             
         except requests.exceptions.RequestException as e:
             print(f"✗ Erro ao buscar indicadores: {e}")
@@ -119,31 +329,36 @@ class WorldBankAPIIntegration:
             Lista de dados do indicador ao longo do tempo
         """
         try:
-            url = f"{self.BASE_URL}/country/{country_code}/indicator/{indicator_code}"
-            params = {
-                'format': 'json',
-                'per_page': 100
-            }
-            
-            if start_year:
-                params['date'] = f"{start_year}:{end_year or datetime.now().year}"
-            
-            response = self.session.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            
-            data = response.json()
-            if len(data) > 1:
-                indicator_data = data[1]
-                if indicator_data:
-                    print(f"✓ {len(indicator_data)} registros recuperados para {country_code} - {indicator_code}")
-                    return indicator_data
-            
-            print(f"ℹ️ Nenhum dado encontrado para {country_code} - {indicator_code}")
-            return []
-            
+            indicator_data = self._fetch_country_data(country_code, indicator_code, start_year, end_year)
         except requests.exceptions.RequestException as e:
             print(f"✗ Erro ao buscar dados do país: {e}")
             return []
+        
+        if indicator_data:
+            print(f"✓ {len(indicator_data)} registros recuperados para {country_code} - {indicator_code}")
+        else:
+            print(f"ℹ️ Nenhum dado encontrado para {country_code} - {indicator_code}")
+        return indicator_data
+    
+    def _fetch_country_data(
+        self,
+        country_code: str,
+        indicator_code: str,
+        start_year: Optional[int] = None,
+        end_year: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Caminho principal de get_country_data: sem logs nem tratamento de erro
+        (exceções de requests são propagadas).
+        """
+        url = self.COUNTRY_INDICATOR_URL.format(countries=country_code, indicator=indicator_code)
+        params = self._SERIES_PARAMS
+        if start_year:
+            params = {**params, 'date': f"{start_year}:{end_year or datetime.now().year}"}
+        
+        data = self._get_json(url, params, ttl=self.CACHE_TTL)
+        # Respostas de erro da API têm um único elemento (sem a lista de registros)
+        return _copy_records((data[1] if len(data) > 1 else None) or [])
     
     def get_multiple_countries_data(
         self,
@@ -163,31 +378,94 @@ class WorldBankAPIIntegration:
             Dicionário com dados por país
         """
         results = {}
+        if not country_codes:
+            print("✓ Dados recuperados para 0 países")
+            return results
+        
+        # Uma única requisição para todos os países (sintaxe 'BRA;USA;CHN' da API v2);
+        # se a consulta em lote falhar, consultar os países individualmente
+        data_by_country = self._get_batched_country_data(country_codes, indicator_code, year)
+        if data_by_country is None:
+            data_by_country = self._get_country_data_concurrently(country_codes, indicator_code, year)
         
         for country_code in country_codes:
-            data = self.get_country_data(
-                country_code, 
-                indicator_code,
-                start_year=year,
-                end_year=year
-            )
-            
+            data = data_by_country.get(country_code)
             if data:
                 # Pegar o valor mais recente se não especificou ano
                 if not year and data:
-                    # Ordenar por data e pegar o mais recente com valor
-                    sorted_data = sorted(
-                        [d for d in data if d.get('value') is not None],
-                        key=lambda x: x.get('date', ''),
-                        reverse=True
-                    )
-                    if sorted_data:
-                        results[country_code] = sorted_data[0]
+                    latest = _latest_with_value(data)
+                    if latest:
+                        results[country_code] = _copy_record(latest)
                 else:
-                    results[country_code] = data[0] if data else None
+                    results[country_code] = _copy_record(data[0]) if data else None
         
         print(f"✓ Dados recuperados para {len(results)} países")
         return results
+    
+    def _get_batched_country_data(
+        self,
+        country_codes: List[str],
+        indicator_code: str,
+        year: Optional[int] = None
+    ) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """
+        Obtém os dados de um indicador para vários países em uma única consulta
+        paginada e agrupa os registros por país.
+        
+        Returns:
+            Dicionário código do país -> registros, ou None se a consulta em lote falhar
+        """
+        url = self.COUNTRY_INDICATOR_URL.format(countries=';'.join(country_codes), indicator=indicator_code)
+        # A API identifica o país pelo código ISO3 ou ISO2; mapear ambos para o código solicitado
+        requested = {code.upper(): code for code in country_codes}
+        data_by_country: Dict[str, List[Dict[str, Any]]] = {code: [] for code in country_codes}
+        
+        page = 1
+        try:
+            while True:
+                params = {
+                    'format': 'json',
+                    'per_page': self.SEARCH_PAGE_SIZE,
+                    'page': page
+                }
+                if year:
+                    params['date'] = f"{year}:{year}"
+                
+                data = self._get_json(url, params, ttl=self.CACHE_TTL)
+                if len(data) < 2:
+                    # Resposta de erro da API (ex: código de país inválido no lote)
+                    return None
+                
+                for row in data[1] or []:
+                    code = (requested.get((row.get('countryiso3code') or '').upper())
+                            or requested.get((row.get('country') or {}).get('id', '').upper()))
+                    if code:
+                        data_by_country[code].append(row)
+                
+                if page >= int(data[0].get('pages') or 1):
+                    return data_by_country
+                page += 1
+        except requests.exceptions.RequestException as e:
+            print(f"ℹ️ Consulta em lote falhou ({e}); consultando países individualmente")
+            return None
+    
+    def _get_country_data_concurrently(
+        self,
+        country_codes: List[str],
+        indicator_code: str,
+        year: Optional[int] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Obtém os dados de um indicador disparando uma requisição por país em paralelo.
+        """
+        # As requisições são I/O-bound: disparar em paralelo reutilizando a mesma sessão
+        # (o pool de conexões do urllib3 é thread-safe e mantém as conexões keep-alive)
+        with ThreadPoolExecutor(max_workers=min(self.MAX_WORKERS, len(country_codes))) as executor:
+            responses = executor.map(
+                lambda code: self.get_country_data(code, indicator_code, start_year=year, end_year=year),
+                country_codes
+            )
+            return dict(zip(country_codes, responses))
 
 
 class ExternalDataEnricher:
@@ -195,8 +473,8 @@ class ExternalDataEnricher:
     Classe para enriquecer Data Products com dados de APIs externas.
     """
     
-    def __init__(self):
-        self.wb_api = WorldBankAPIIntegration()
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.wb_api = WorldBankAPIIntegration(cache_dir=cache_dir)
     
     def enrich_with_country_indicators(
         self,
@@ -219,21 +497,24 @@ class ExternalDataEnricher:
             'retrieved_at': datetime.now().isoformat()
         }
         
-        for indicator_code in indicators:
-            data = self.wb_api.get_country_data(country_code, indicator_code)
+        if not indicators:
+            return enriched_data
+        
+        with ThreadPoolExecutor(max_workers=min(self.wb_api.MAX_WORKERS, len(indicators))) as executor:
+            responses = list(executor.map(
+                lambda code: self.wb_api.get_country_data(country_code, code),
+                indicators
+            ))
+        
+        for indicator_code, data in zip(indicators, responses):
             if data:
                 # Pegar o valor mais recente
-                recent_data = [d for d in data if d.get('value') is not None]
-                if recent_data:
-                    sorted_data = sorted(
-                        recent_data,
-                        key=lambda x: x.get('date', ''),
-                        reverse=True
-                    )
+                latest = _latest_with_value(data)
+                if latest:
                     enriched_data['indicators'][indicator_code] = {
-                        'value': sorted_data[0].get('value'),
-                        'date': sorted_data[0].get('date'),
-                        'indicator_name': sorted_data[0].get('indicator', {}).get('value', '')
+                        'value': latest.get('value'),
+                        'date': latest.get('date'),
+                        'indicator_name': _label(latest, 'indicator')
                     }
         
         return enriched_data
@@ -263,19 +544,22 @@ class ExternalDataEnricher:
         
         comparative_data = []
         for country_code, country_data in data.items():
-            if country_data and country_data.get('value') is not None:
+            if not country_data:
+                continue
+            value = country_data.get('value')
+            if value is not None:
                 comparative_data.append({
                     'country_code': country_code,
-                    'country_name': country_data.get('country', {}).get('value', ''),
+                    'country_name': _label(country_data, 'country'),
                     'indicator_code': indicator_code,
-                    'indicator_name': country_data.get('indicator', {}).get('value', ''),
-                    'value': country_data.get('value'),
+                    'indicator_name': _label(country_data, 'indicator'),
+                    'value': value,
                     'year': country_data.get('date'),
                     'unit': country_data.get('unit', '')
                 })
         
-        # Ordenar por valor
-        comparative_data.sort(key=lambda x: x['value'], reverse=True)
+        # Ordenar por valor (registros sem valor já foram descartados acima)
+        comparative_data.sort(key=itemgetter('value'), reverse=True)
         
         return comparative_data
 
@@ -8,17 +8,60 @@ Este módulo demonstra um produto de dados de clientes em uma arquitetura Data M
 utilizando o DomainDataProduct como base para gerenciamento de dados e metadados.
 """
 
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional
 from datetime import datetime
 import json
-import re
-from collections import defaultdict
+import logging
+from collections import Counter
 
 try:
     from .domain_data_product import DomainDataProduct, DataProductMetadata, DataSchema, DataProductSLA, DataProductStatus, DataQualityLevel
 except ImportError:
     from domain_data_product import DomainDataProduct, DataProductMetadata, DataSchema, DataProductSLA, DataProductStatus, DataQualityLevel
 
+logger = logging.getLogger(__name__)
+
+
+# Campos obrigatórios de um registro de cliente
+_REQUIRED_FIELDS = frozenset(("customer_id", "name", "email", "registration_date", "lifetime_value", "tier"))
+
+# Posições dos separadores na forma canônica (zero-padded) de cada formato de data aceito
+_ISO_SEPARATORS = {
+    "%Y-%m-%d": (10, ((4, "-"), (7, "-"))),
+    "%Y-%m-%d %H:%M:%S": (19, ((4, "-"), (7, "-"), (10, " "), (13, ":"), (16, ":"))),
+}
+
+
+def _parse_datetime(value: str, fmt: str) -> datetime:
+    """
+    Converte uma data no formato fmt. Strings na forma canônica usam o caminho
+    rápido datetime.fromisoformat; as demais (ex: '2024-1-5') caem no strptime,
+    preservando exatamente o que o formato aceita. Levanta ValueError se inválida.
+    """
+    length, separators = _ISO_SEPARATORS[fmt]
+    if len(value) == length and all(value[i] == sep for i, sep in separators):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.strptime(value, fmt)
+
+
+def _valid_email(email: str) -> bool:
+    """
+    Valida o formato local@dominio.tld usando apenas buscas em string.
+
+    Equivalente ao padrão r"[^@]+@[^@]+\\.[^@]+" aplicado ao e-mail inteiro:
+    exatamente um "@" (não inicial) e um "." no domínio que não seja nem o
+    primeiro nem o último caractere.
+    """
+    at = email.find("@")
+    return (
+        at > 0
+        and email.find("@", at + 1) == -1
+        and email.find(".", at + 2, len(email) - 1) != -1
+    )
+
 
 class CustomerDataProduct(DomainDataProduct):
     """
@@ -66,82 +109,155 @@ class CustomerDataProduct(DomainDataProduct):
         )
         
         super().__init__(metadata, schema, sla)
-        self._segments: Dict[str, List[str]] = {}
-
-    def add_data(self, customer_data: Dict[str, Any]) -> bool:
+        # Segmentos como dicts ordenados customer_id -> None: pertinência e remoção em O(1)
+        self._segments: Dict[str, Dict[str, None]] = {}
+        self._stored_criteria: Dict[str, Callable[[Dict[str, Any]], bool]] = {}
+        # Índice da chave primária (customer_id -> posições) mantido pela classe base,
+        # usado para checar unicidade em O(1)
+        self._customer_id_index = self._indexes["customer_id"]
+        # last_interaction já convertido em datetime: customer_id -> (texto original, datetime)
+        self._interaction_times: Dict[str, Any] = {}
+
+    def add_data(self, customer_data: Dict[str, Any], *, validate: bool = True) -> bool:
         """
         Adiciona dados de cliente ao Data Product, com validações adicionais.
         """
-        if not self._validate_customer_data(customer_data):
-            print(f"✗ Falha ao adicionar dados: Validação de dados de cliente falhou para {customer_data.get('customer_id', 'N/A')}")
+        if validate and not self._validate_customer_data(customer_data):
+            logger.warning("✗ Falha ao adicionar dados: Validação de dados de cliente falhou para %s", customer_data.get('customer_id', 'N/A'))
             return False
         
-        if not super().add_data(customer_data):
+        if not super().add_data(customer_data, validate=validate):
             return False
         
-        # Atualizar segmentos após adicionar novo cliente
-        self._update_all_segments()
+        self._remember_interaction_time(customer_data)
+        # Atualizar segmentos após adicionar novo cliente (apenas o novo registro é avaliado)
+        self._update_all_segments("add", [customer_data])
         return True
 
     def update_data(self, filters: Dict[str, Any], new_data: Dict[str, Any]) -> int:
         """
         Atualiza dados de cliente existentes no Data Product com base em filtros.
         """
+        # Registros afetados (os mesmos objetos serão alterados in-place pela classe base)
+        affected = [
+            self._data_store[pos] for pos in self._find_positions(filters)
+        ] if self._stored_criteria and filters else []
+        previous_ids = [record.get("customer_id") for record in affected]
+
         updated_count = super().update_data(filters, new_data)
         if updated_count > 0:
-            self._update_all_segments()
+            self._update_all_segments("update", affected, previous_ids)
         return updated_count
 
     def remove_data(self, filters: Dict[str, Any]) -> int:
         """
         Remove dados de cliente do Data Product com base em filtros.
         """
+        candidate_ids = {self._data_store[pos].get("customer_id") for pos in self._find_positions(filters)} if filters else set()
         removed_count = super().remove_data(filters)
         if removed_count > 0:
-            self._update_all_segments()
+            # customer_ids que deixaram de existir (o índice já foi reconstruído pela classe base)
+            removed_ids = [cid for cid in candidate_ids if cid not in self._customer_id_index]
+            for cid in removed_ids:
+                self._interaction_times.pop(cid, None)
+            self._update_all_segments("remove", previous_ids=removed_ids)
         return removed_count
 
+    def _validate_record(self, customer_data: Dict[str, Any]) -> bool:
+        return self._validate_customer_data(customer_data) and super()._validate_record(customer_data)
+
+    def _on_record_added(self, customer_data: Dict[str, Any]) -> None:
+        self._remember_interaction_time(customer_data)
+        self._update_all_segments("add", [customer_data])
+
+    def _remember_interaction_time(self, customer_data: Dict[str, Any]) -> None:
+        """
+        Guarda last_interaction já convertido para um cliente recém-armazenado.
+        Valores inválidos (possíveis com validate=False) ficam de fora do cache.
+        """
+        raw = customer_data.get("last_interaction")
+        if raw:
+            try:
+                parsed = _parse_datetime(raw, "%Y-%m-%d %H:%M:%S")
+            except (TypeError, ValueError):
+                return
+            self._interaction_times[customer_data["customer_id"]] = (raw, parsed)
+
     def _validate_customer_data(self, customer_data: Dict[str, Any]) -> bool:
         """
         Valida dados de cliente específicos, além do schema básico.
+        Não altera o estado do Data Product (os caches são preenchidos só após a inclusão).
         """
-        required_fields = ["customer_id", "name", "email", "registration_date", "lifetime_value", "tier"]
-        if not all(field in customer_data for field in required_fields):
-            print(f"✗ Dados de cliente incompletos. Campos obrigatórios: {required_fields}")
+        if not _REQUIRED_FIELDS.issubset(customer_data):
+            logger.warning("✗ Dados de cliente incompletos. Campos obrigatórios: %s", sorted(_REQUIRED_FIELDS))
             return False
         
+        get = customer_data.get
+        email = customer_data["email"]
+        registration_date = customer_data["registration_date"]
+        last_interaction = get("last_interaction")
+        lifetime_value = customer_data["lifetime_value"]
+
         # Validação de formato de e-mail
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", customer_data["email"]):
-            print(f"✗ Formato de e-mail inválido para {customer_data['email']}")
+        if not _valid_email(email):
+            logger.warning("✗ Formato de e-mail inválido para %s", email)
             return False
 
         # Validação de formato de data de registro
         try:
-            datetime.strptime(customer_data["registration_date"], "%Y-%m-%d")
+            _parse_datetime(registration_date, "%Y-%m-%d")
         except ValueError:
-            print(f"✗ Formato de registration_date inválido para {customer_data['registration_date']}. Esperado YYYY-MM-DD.")
+            logger.warning("✗ Formato de registration_date inválido para %s. Esperado YYYY-MM-DD.", registration_date)
             return False
         
         # Validação de formato de última interação (se presente)
-        if "last_interaction" in customer_data and customer_data["last_interaction"]:
+        if last_interaction:
             try:
-                datetime.strptime(customer_data["last_interaction"], "%Y-%m-%d %H:%M:%S")
+                _parse_datetime(last_interaction, "%Y-%m-%d %H:%M:%S")
             except ValueError:
-                print(f"✗ Formato de last_interaction inválido para {customer_data['last_interaction']}. Esperado YYYY-MM-DD HH:MM:SS.")
+                logger.warning("✗ Formato de last_interaction inválido para %s. Esperado YYYY-MM-DD HH:MM:SS.", last_interaction)
                 return False
 
         # Validação de valor de lifetime_value
-        if not isinstance(customer_data["lifetime_value"], (int, float)) or customer_data["lifetime_value"] < 0:
-            print(f"✗ Valor de lifetime_value inválido para {customer_data['lifetime_value']}. Deve ser um número não negativo.")
+        if not isinstance(lifetime_value, (int, float)) or lifetime_value < 0:
+            logger.warning("✗ Valor de lifetime_value inválido para %s. Deve ser um número não negativo.", lifetime_value)
             return False
         
         # Validação de unicidade de customer_id
-        if any(record.get("customer_id") == customer_data["customer_id"] for record in self._data_store):
-            print(f"✗ customer_id {customer_data['customer_id']} já existe. Clientes devem ser únicos.")
+        cid = customer_data["customer_id"]
+        try:
+            duplicate = cid in self._customer_id_index
+        except TypeError:  # id não-hashable: será rejeitado pela validação de schema
+            duplicate = False
+        if duplicate:
+            logger.warning("✗ customer_id %s já existe. Clientes devem ser únicos.", cid)
             return False
 
         return True
 
+    def get_last_interaction(self, customer: Dict[str, Any]) -> Optional[datetime]:
+        """
+        Retorna last_interaction do cliente como datetime (ou None se ausente),
+        convertendo o texto apenas uma vez por valor. Só clientes armazenados usam
+        o cache; os demais são convertidos sem deixar entradas nele.
+        """
+        raw = customer.get("last_interaction")
+        if not raw:
+            return None
+        cid = customer.get("customer_id")
+        try:
+            stored = cid in self._customer_id_index
+        except TypeError:  # id não-hashable: nunca está armazenado
+            stored = False
+        if not stored:
+            return _parse_datetime(raw, "%Y-%m-%d %H:%M:%S")
+        cached = self._interaction_times.get(cid)
+        if cached is not None and cached[0] == raw:
+            return cached[1]
+        parsed = _parse_datetime(raw, "%Y-%m-%d %H:%M:%S")
+        self._interaction_times[cid] = (raw, parsed)
+        return parsed
+
     def create_segment(self, segment_name: str, criteria_func: callable) -> None:
         """
         Cria um segmento de clientes baseado em critérios dinâmicos.
@@ -150,31 +266,67 @@ class CustomerDataProduct(DomainDataProduct):
             segment_name: Nome do segmento
             criteria_func: Função que recebe um dicionário de dados do cliente e retorna True/False
         """
-        self._segments[segment_name] = [
-            customer["customer_id"] for customer in self._data_store
+        self._stored_criteria[segment_name] = criteria_func
+        self._segments[segment_name] = {
+            customer["customer_id"]: None for customer in self._data_store
             if criteria_func(customer)
-        ]
-        print(f"✓ Segmento \'{segment_name}\' criado/atualizado com {len(self._segments[segment_name])} clientes.")
+        }
+        logger.info("✓ Segmento '%s' criado/atualizado com %d clientes.", segment_name, len(self._segments[segment_name]))
     
-    def _update_all_segments(self) -> None:
+    def _update_all_segments(self, op: Optional[str] = None,
+                             records: Optional[List[Dict[str, Any]]] = None,
+                             previous_ids: Optional[List[str]] = None) -> None:
         """
-        Re-avalia e atualiza todos os segmentos existentes. Chamado após operações de dados.
-        (Em um cenário real, isso poderia ser otimizado ou acionado por eventos).
+        Atualiza os segmentos existentes após operações de dados.
+
+        Sem `op`, todos os segmentos são recriados a partir dos critérios armazenados.
+        Com `op` ("add", "update" ou "remove"), apenas os registros afetados são
+        re-avaliados, evitando uma varredura completa a cada alteração.
+
+        Args:
+            op: Tipo de operação realizada
+            records: Registros adicionados ou atualizados
+            previous_ids: customer_ids que deixaram de existir (ou que existiam antes da atualização)
         """
-        # Para simplificar, vamos apenas recriar os segmentos existentes. 
-        # Em um sistema real, seria necessário armazenar as `criteria_func` ou uma representação delas.
-        # Por enquanto, este método é um placeholder para indicar que os segmentos precisam ser atualizados.
-        print("ℹ️ Segmentos precisam ser re-avaliados após alterações nos dados.")
-        # Exemplo: se tivéssemos armazenado as funções lambda, poderíamos reexecutá-las aqui.
-        # for segment_name, criteria_func in self._stored_criteria.items():
-        #     self.create_segment(segment_name, criteria_func)
+        if op is None:
+            for segment_name, criteria_func in self._stored_criteria.items():
+                self._segments[segment_name] = {
+                    customer["customer_id"]: None for customer in self._data_store
+                    if criteria_func(customer)
+                }
+            return
+
+        for segment_name, criteria_func in self._stored_criteria.items():
+            members = self._segments[segment_name]
+            for cid in previous_ids or ():
+                members.pop(cid, None)
+            for record in records or ():
+                if criteria_func(record):
+                    members[record["customer_id"]] = None
 
     def get_segment(self, segment_name: str) -> List[str]:
         """
         Retorna os IDs dos clientes em um segmento.
         """
-        return self._segments.get(segment_name, [])
+        return list(self._segments.get(segment_name, ()))
+
+    def is_in_segment(self, segment_name: str, customer_id: str) -> bool:
+        """
+        Verifica em O(1) se um cliente pertence a um segmento.
+        """
+        return customer_id in self._segments.get(segment_name, ())
     
+    def intersect_segments(self, *segment_names: str) -> List[str]:
+        """
+        Retorna os IDs dos clientes presentes em todos os segmentos informados,
+        na ordem do menor segmento, sem copiar os segmentos para sets.
+        """
+        if not segment_names:
+            return []
+        segments = sorted((self._segments.get(name, {}) for name in segment_names), key=len)
+        smallest, others = segments[0], segments[1:]
+        return [cid for cid in smallest if all(cid in members for members in others)]
+
     def get_segment_statistics(self) -> Dict[str, Any]:
         """
         Retorna estatísticas sobre os segmentos de clientes.
@@ -203,9 +355,7 @@ class CustomerDataProduct(DomainDataProduct):
         if not self._data_store:
             return {"message": "No customer data to generate demographics."}
 
-        tiers = defaultdict(int)
-        for customer in self._data_store:
-            tiers[customer.get("tier", "Unknown")] += 1
+        tiers = Counter(customer.get("tier", "Unknown") for customer in self._data_store)
         
         return {
             "total_customers": len(self._data_store),
@@ -222,30 +372,44 @@ class CustomerDataProduct(DomainDataProduct):
         if total_records == 0:
             return {"message": "No data to generate quality report."}
 
-        # Contagem de valores nulos por campo
-        null_counts = defaultdict(int)
+        # Uma única passada sobre os registros acumulando todas as contagens:
+        # valores nulos por campo, e-mails inválidos e lifetime_value fora do range
+        field_names = tuple(self.schema.fields)
+        schema_fields = frozenset(field_names)
+        null_counts = dict.fromkeys(field_names, 0)
+        invalid_emails = 0
+        invalid_ltv = 0
+        valid_email = _valid_email
+        number_types = (int, float)
         for record in self._data_store:
-            for field_name in self.schema.fields.keys():
-                if record.get(field_name) is None or record.get(field_name) == "":
+            get = record.get
+            # Campos ausentes via diferença de conjuntos (em C); o laço em Python
+            # só visita os campos presentes para detectar valores vazios
+            for field_name in schema_fields - record.keys():
+                null_counts[field_name] += 1
+            for field_name, value in record.items():
+                if (value is None or value == "") and field_name in schema_fields:
                     null_counts[field_name] += 1
+            if not valid_email(get("email") or ""):
+                invalid_emails += 1
+            ltv = get("lifetime_value")
+            if not (isinstance(ltv, number_types) and ltv >= 0):
+                invalid_ltv += 1
         
         completeness_by_field = {
             field: round((1 - null_counts[field] / total_records) * 100, 2)
-            for field in self.schema.fields.keys()
+            for field in field_names
         }
 
         # Validação de unicidade para customer_id
-        customer_ids = [record["customer_id"] for record in self._data_store if "customer_id" in record]
-        unique_customer_ids = len(set(customer_ids))
+        unique_customer_ids = len(self._customer_id_index) - (None in self._customer_id_index)
         duplicate_customers = total_records - unique_customer_ids
         uniqueness_rate = round((unique_customer_ids / total_records) * 100, 2)
 
         # Validação de formato de e-mail
-        invalid_emails = sum(1 for record in self._data_store if not re.match(r"[^@]+@[^@]+\.[^@]+", record.get("email", "")))
         email_validity_rate = round((1 - invalid_emails / total_records) * 100, 2)
 
         # Validação de range para 'lifetime_value'
-        invalid_ltv = sum(1 for record in self._data_store if not (isinstance(record.get("lifetime_value"), (int, float)) and record["lifetime_value"] >= 0))
         ltv_validity_rate = round((1 - invalid_ltv / total_records) * 100, 2)
 
         # Comparar com SLA
@@ -278,6 +442,7 @@ class CustomerDataProduct(DomainDataProduct):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("=" * 80)
     print("Customer Data Product - Advanced Example")
     print("=" * 80)
@@ -335,7 +500,9 @@ if __name__ == "__main__":
     for data in sample_customer_data:
         customer_product.add_data(data)
     
-    # Criar segmentos dinamicamente
+    # Criar segmentos dinamicamente (constantes dos critérios calculadas uma única vez)
+    recent_threshold = datetime(2025, 10, 6)
+    no_interaction = datetime.min
     customer_product.create_segment(
         "high_value_customers",
         lambda c: c.get("lifetime_value", 0) > 3000 and c.get("tier") == "gold"
@@ -343,12 +510,12 @@ if __name__ == "__main__":
     
     customer_product.create_segment(
         "recent_interactions",
-        lambda c: datetime.strptime(c.get("last_interaction", "2000-01-01 00:00:00"), "%Y-%m-%d %H:%M:%S") > datetime(2025, 10, 6)
+        lambda c: (customer_product.get_last_interaction(c) or no_interaction) > recent_threshold
     )
 
     customer_product.create_segment(
         "new_customers_2025",
-        lambda c: datetime.strptime(c.get("registration_date", "2000-01-01"), "%Y-%m-%d").year == 2025
+        lambda c: datetime.fromisoformat(c.get("registration_date", "2000-01-01")).year == 2025
     )
     
     print("\n" + "=" * 30 + " Customer Demographics " + "=" * 26)
@@ -9,12 +9,90 @@ Um Data Product é uma unidade autônoma que encapsula dados, metadados, código
 """
 
 from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple
 from datetime import datetime
 from enum import Enum
+from bisect import insort
+from functools import lru_cache
+from collections import OrderedDict, deque
 import json
+import logging
 import os
 import sys
+import time
+
+try:
+    import orjson  # Parser JSON opcional (extra "fast"), bem mais rápido que o json da stdlib
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+# Tipos de campo suportados pelo schema e o tipo Python correspondente
+_TYPE_MAP = {"integer": int, "float": float, "string": str}
+_TYPE_LABELS = {"integer": "inteiro", "float": "float", "string": "string"}
+
+# Validadores compilados, compartilhados entre schemas com os mesmos campos
+_VALIDATOR_CACHE: Dict[Tuple[Tuple[str, str], ...], Callable[[Dict[str, Any]], bool]] = {}
+
+
+def _compile_validator(fields: Dict[str, str]) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Gera (uma única vez por conjunto de campos) uma função que verifica presença
+    e tipo de todos os campos do schema em uma única expressão booleana.
+    """
+    key = tuple(sorted(fields.items()))
+    validator = _VALIDATOR_CACHE.get(key)
+    if validator is not None:
+        return validator
+
+    namespace: Dict[str, Any] = {}
+    checks = []
+    for i, (field_name, field_type) in enumerate(key):
+        check = f"{field_name!r} in d"
+        if field_type in _TYPE_MAP:
+            namespace[f"_t{i}"] = _TYPE_MAP[field_type]
+            check += f" and isinstance(d[{field_name!r}], _t{i})"
+        checks.append(f"({check})")
+    source = "def _validate(d):\n    return " + (" and ".join(checks) or "True") + "\n"
+    exec(compile(source, "<schema validator>", "exec"), namespace)
+
+    validator = _VALIDATOR_CACHE[key] = namespace["_validate"]
+    return validator
+
+
+def _decode_json(raw: Any) -> Any:
+    """
+    Decodifica um documento JSON em memória (bytes ou str, UTF-8), usando orjson
+    quando disponível. Erros de sintaxe levantam json.JSONDecodeError em ambos os casos.
+    """
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _load_json_file(filepath: str) -> Any:
+    """
+    Lê e decodifica um arquivo JSON (UTF-8). O arquivo é lido de uma só vez
+    como bytes e decodificado direto deles.
+    """
+    with open(filepath, 'rb') as f:
+        return _decode_json(f.read())
+
+
+@lru_cache(maxsize=256)
+def _compile_filter(keys: Tuple[str, ...]) -> Callable[..., Callable[[Dict[str, Any]], bool]]:
+    """
+    Gera, uma vez por formato de filtro (tupla de campos), uma fábrica que recebe
+    os valores e devolve o predicado `r.get(k0) == v0 and r.get(k1) == v1 ...`.
+    """
+    args = ", ".join(f"_v{i}" for i in range(len(keys)))
+    body = " and ".join(f"r.get({key!r}) == _v{i}" for i, key in enumerate(keys)) or "True"
+    source = f"def _make({args}):\n    def _match(r):\n        return {body}\n    return _match\n"
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, "<query filter>", "exec"), namespace)
+    return namespace["_make"]
 
 
 class DataProductStatus(Enum):
@@ -54,6 +132,45 @@ class DataSchema:
     primary_key: Optional[str] = None
     indexes: List[str] = field(default_factory=list)
 
+    def __post_init__(self):
+        self.recompile()
+
+    def recompile(self) -> None:
+        """
+        Compila o validador e o mapa de tipos para os campos atuais. São atributos
+        comuns (não campos do dataclass), fora de fields()/asdict()/repr.
+
+        Trocar o dict `fields` ou incluir/remover campos é detectado automaticamente;
+        ao alterar apenas o tipo de um campo existente, chame recompile().
+        """
+        fields = self.fields
+        self._compiled_source = fields
+        self._compiled_size = len(fields)
+        self._compiled_validator = _compile_validator(fields)
+        # Tipo Python esperado por campo (campos de tipo livre ficam de fora)
+        self._compiled_field_types = {
+            name: _TYPE_MAP[field_type] for name, field_type in fields.items() if field_type in _TYPE_MAP
+        }
+
+    def _is_stale(self) -> bool:
+        """Checagem O(1) (identidade e tamanho de `fields`) feita a cada registro validado."""
+        fields = self.fields
+        return fields is not self._compiled_source or len(fields) != self._compiled_size
+
+    @property
+    def _validator(self) -> Callable[[Dict[str, Any]], bool]:
+        """Validador compilado, recompilado se `fields` mudou (ver recompile)."""
+        if self._is_stale():
+            self.recompile()
+        return self._compiled_validator
+
+    @property
+    def _field_types(self) -> Dict[str, type]:
+        """Tipo Python esperado por campo, acompanhando alterações em `fields`."""
+        if self._is_stale():
+            self.recompile()
+        return self._compiled_field_types
+
 
 @dataclass
 class DataProductSLA:
@@ -74,15 +191,38 @@ class DomainDataProduct:
     3. Self-serve Data Platform: Interface padronizada para descoberta e consumo.
     4. Federated Computational Governance: Políticas de governança aplicadas.
     """
+
+    QUERY_CACHE_SIZE = 256  # Máximo de resultados de consulta memorizados
+    ACCESS_LOG_SIZE = 10000  # Máximo de entradas mantidas no log de acessos
     
     def __init__(self, metadata: DataProductMetadata, schema: DataSchema, sla: DataProductSLA):
         self.metadata = metadata
         self.schema = schema
         self.sla = sla
-        self._data_store: List[Dict[str, Any]] = []  # Armazenamento interno de dados
-        self._access_log: List[Dict[str, Any]] = []  # Log de acessos para auditoria
-        self._upstream_dependencies: List[str] = []  # Data Products dos quais este depende
-        self._downstream_consumers: List[str] = []  # Data Products que consomem este
+        # Armazenamento interno de dados. Os registros pertencem ao Data Product: add_data/add_many
+        # guardam cópias e query devolve cópias, de modo que só update_data/remove_data os alteram
+        # (mantendo os índices e o cache de consultas coerentes)
+        self._data_store: List[Dict[str, Any]] = []
+        # Log de acessos para auditoria: buffer circular de tuplas
+        # (time_ns, operação, parâmetros, data product, versão), convertidas em dicts sob demanda
+        self._access_entries: deque = deque(maxlen=self.ACCESS_LOG_SIZE)
+        self._access_count = 0
+        # Nomes dos Data Products relacionados (dicts como conjuntos ordenados: checagem O(1))
+        self._upstream_dependencies: Dict[str, None] = {}  # Data Products dos quais este depende
+        self._downstream_consumers: Dict[str, None] = {}  # Data Products que consomem este
+        # Índices hash (valor -> posições em _data_store, em ordem crescente) para a
+        # chave primária e os índices declarados no schema
+        index_fields = [schema.primary_key] + list(schema.indexes) if schema.primary_key else list(schema.indexes)
+        self._indexes: Dict[str, Dict[Any, List[int]]] = {name: {} for name in index_fields}
+        # Versão dos dados, incrementada a cada alteração, e cache LRU de consultas
+        # (filtros -> posições em _data_store; os registros são copiados a cada retorno)
+        self._version = 0
+        self._query_cache: "OrderedDict[Any, Tuple[int, ...]]" = OrderedDict()
+        # Snapshot (tupla de cópias) de todos os registros, válido enquanto _version não mudar
+        self._snapshot: Tuple[Dict[str, Any], ...] = ()
+        self._snapshot_version = -1
+        # Datas formatadas de get_lineage, reaproveitadas enquanto created_at/updated_at não mudarem
+        self._timestamps_cache: Optional[Tuple[Tuple[datetime, datetime], Tuple[str, str]]] = None
     
     def publish(self) -> bool:
         """
@@ -90,12 +230,12 @@ class DomainDataProduct:
         Valida se todos os requisitos foram atendidos antes da publicação.
         """
         if not self._validate_for_publication():
-            print(f"✗ Falha na publicação: Validações pendentes para o Data Product \'{self.metadata.name}\'")
+            logger.warning("✗ Falha na publicação: Validações pendentes para o Data Product '%s'", self.metadata.name)
             return False
         
         self.metadata.status = DataProductStatus.PUBLISHED
         self.metadata.updated_at = datetime.now()
-        print(f"✓ Data Product \'{self.metadata.name}\' v{self.metadata.version} publicado com sucesso!")
+        logger.info("✓ Data Product '%s' v%s publicado com sucesso!", self.metadata.name, self.metadata.version)
         return True
 
     def _validate_for_publication(self) -> bool:
@@ -110,25 +250,90 @@ class DomainDataProduct:
         
         for value, error_msg in validations:
             if not value:
-                print(f"✗ Validação falhou: {error_msg}")
+                logger.warning("✗ Validação falhou: %s", error_msg)
                 return False
         
         # Adicionar validações de qualidade e conformidade aqui
-        if self.metadata.quality_level == DataQualityLevel.BRONZE and self.metadata.status == DataProductStatus.PUBLISHED:
-            print(f"⚠️ Aviso: Data Product \'{self.metadata.name}\' está sendo publicado com nível de qualidade BRONZE. Considere elevar o nível de qualidade.")
+        if self.metadata.quality_level is DataQualityLevel.BRONZE and self.metadata.status is DataProductStatus.PUBLISHED:
+            logger.warning("⚠️ Aviso: Data Product '%s' está sendo publicado com nível de qualidade BRONZE. Considere elevar o nível de qualidade.", self.metadata.name)
 
         return True
     
-    def add_data(self, data: Dict[str, Any]) -> bool:
+    def add_data(self, data: Dict[str, Any], *, validate: bool = True) -> bool:
         """
         Adiciona dados ao Data Product, validando-os contra o schema definido.
+        Com validate=False (fontes confiáveis, já validadas) a validação é ignorada.
+        O registro armazenado é uma cópia: alterar `data` depois não afeta o Data Product.
         """
-        if not self._validate_data_schema(data):
-            print(f"✗ Falha ao adicionar dados: Dados não conformes com o schema do Data Product \'{self.metadata.name}\'")
+        if validate and not self._validate_data_schema(data):
+            logger.warning("✗ Falha ao adicionar dados: Dados não conformes com o schema do Data Product '%s'", self.metadata.name)
+            return False
+        if not self._check_storable(data):
             return False
         
-        self._data_store.append(data)
-        print(f"✓ Dados adicionados ao Data Product \'{self.metadata.name}\'")
+        record = dict(data)
+        self._data_store.append(record)
+        self._index_record(len(self._data_store) - 1, record)
+        self._bump_version()
+        logger.info("✓ Dados adicionados ao Data Product '%s'", self.metadata.name)
+        return True
+    
+    def add_many(self, records: List[Dict[str, Any]], *, validate: bool = True,
+                 log_summary: bool = True) -> Tuple[int, int]:
+        """
+        Adiciona um lote de registros com uma única invalidação de cache,
+        um único registro de auditoria e uma única mensagem de resumo.
+        
+        Args:
+            records: Lista de registros a adicionar
+            validate: Se False, os registros são aceitos sem validação (fonte confiável)
+            log_summary: Se False, não registra a mensagem de resumo (quem chama registra a sua)
+            
+        Returns:
+            Tupla (aceitos, rejeitados)
+        """
+        data_store = self._data_store
+        validate = self._validate_record if validate else None
+        accepted = 0
+        for record in records:
+            if validate is not None and not validate(record):
+                continue
+            if not self._check_storable(record):
+                continue
+            # Cada registro (copiado) entra no store imediatamente para que validações
+            # de unicidade dos registros seguintes do mesmo lote o enxerguem
+            record = dict(record)
+            data_store.append(record)
+            self._index_record(len(data_store) - 1, record)
+            self._on_record_added(record)
+            accepted += 1
+        
+        rejected = len(records) - accepted
+        if accepted:
+            self._bump_version()
+        if log_summary:
+            logger.info("✓ %d de %d registros adicionados ao Data Product '%s'", accepted, len(records), self.metadata.name)
+        return accepted, rejected
+
+    def _validate_record(self, data: Dict[str, Any]) -> bool:
+        """Validação completa de um registro usada por add_many (subclasses estendem)."""
+        return self._validate_data_schema(data)
+
+    def _on_record_added(self, data: Dict[str, Any]) -> None:
+        """Gancho chamado por add_many após cada registro aceito (subclasses estendem)."""
+
+    def _check_storable(self, data: Dict[str, Any]) -> bool:
+        """
+        Verifica, antes de armazenar (mesmo com validate=False), se o registro pode
+        entrar nos índices hash: valores de campos indexados precisam ser hashable.
+        Subclasses estendem com as checagens de que seus agregados dependem.
+        """
+        for name in self._indexes:
+            try:
+                hash(data.get(name))
+            except TypeError:
+                logger.warning("✗ Valor não-hashable no campo indexado '%s' do Data Product '%s'", name, self.metadata.name)
+                return False
         return True
     
     def _validate_data_schema(self, data: Dict[str, Any]) -> bool:
@@ -136,40 +341,65 @@ class DomainDataProduct:
         Valida se os dados seguem o schema definido.
         Retorna True se válido, False caso contrário.
         """
+        # Caminho rápido: validador compilado do schema. O laço abaixo só é
+        # executado para registros inválidos, para identificar o campo com problema.
+        if self.schema._validator(data):
+            return True
         for field_name, field_type in self.schema.fields.items():
             if field_name not in data:
-                print(f"✗ Campo obrigatório \'{field_name}\' não encontrado nos dados")
+                logger.warning("✗ Campo obrigatório '%s' não encontrado nos dados", field_name)
                 return False
             # Validação de tipo básica (pode ser expandida)
-            if field_type == "integer" and not isinstance(data[field_name], int):
-                print(f"✗ Tipo inválido para o campo \'{field_name}\' (esperado inteiro, recebido {type(data[field_name]).__name__})")
-                return False
-            if field_type == "float" and not isinstance(data[field_name], float):
-                print(f"✗ Tipo inválido para o campo \'{field_name}\' (esperado float, recebido {type(data[field_name]).__name__})")
-                return False
-            if field_type == "string" and not isinstance(data[field_name], str):
-                print(f"✗ Tipo inválido para o campo \'{field_name}\' (esperado string, recebido {type(data[field_name]).__name__})")
+            if not self._check_field_type(field_name, field_type, data[field_name]):
                 return False
         return True
     
-    def query(self, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    @staticmethod
+    def _check_field_type(field_name: str, field_type: str, value: Any) -> bool:
+        """Verifica o tipo de um valor via _TYPE_MAP, reportando o erro se inválido."""
+        expected = _TYPE_MAP.get(field_type)
+        if expected is None or isinstance(value, expected):
+            return True
+        logger.warning("✗ Tipo inválido para o campo '%s' (esperado %s, recebido %s)", field_name, _TYPE_LABELS[field_type], type(value).__name__)
+        return False
+    
+    def query(self, filters: Optional[Dict[str, Any]] = None) -> Sequence[Dict[str, Any]]:
         """
         Consulta dados do Data Product com base em filtros.
         Registra o acesso para auditoria e monitoramento.
+        Retorna cópias dos registros: alterá-las não afeta os dados nem os índices
+        (use update_data para modificar registros).
+        Sem filtros, retorna um snapshot imutável (tupla de cópias), copiado uma única
+        vez por versão dos dados e compartilhado entre as consultas até a próxima alteração.
         """
         self._log_access("query", filters)
         
         if not filters:
-            print(f"ℹ️ Consultando todos os {len(self._data_store)} registros do Data Product \'{self.metadata.name}\'")
-            return self._data_store
+            logger.info("ℹ️ Consultando todos os %d registros do Data Product '%s'", len(self._data_store), self.metadata.name)
+            if self._snapshot_version != self._version:
+                self._snapshot = tuple([dict(record) for record in self._data_store])
+                self._snapshot_version = self._version
+            return self._snapshot
         
-        results = []
-        for record in self._data_store:
-            match = all(record.get(k) == v for k, v in filters.items())
-            if match:
-                results.append(record)
+        try:
+            cache_key = tuple(sorted(filters.items()))
+            hash(cache_key)
+        except TypeError:  # filtros com valores não-hashable não são memorizados
+            cache_key = None
+
+        positions = self._query_cache.get(cache_key) if cache_key is not None else None
+        if positions is not None:
+            self._query_cache.move_to_end(cache_key)
+        else:
+            positions = tuple(self._find_positions(filters))
+            if cache_key is not None:
+                self._query_cache[cache_key] = positions
+                if len(self._query_cache) > self.QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+        data_store = self._data_store
+        results = [dict(data_store[pos]) for pos in positions]
         
-        print(f"✓ {len(results)} registros encontrados para os filtros {filters} no Data Product \'{self.metadata.name}\'")
+        logger.info("✓ %d registros encontrados para os filtros %s no Data Product '%s'", len(results), filters, self.metadata.name)
         return results
     
     def update_data(self, filters: Dict[str, Any], new_data: Dict[str, Any]) -> int:
@@ -178,35 +408,35 @@ class DomainDataProduct:
         Registra a operação para auditoria.
         """
         if not filters:
-            print("✗ Erro: Filtros são obrigatórios para atualizar dados.")
+            logger.warning("✗ Erro: Filtros são obrigatórios para atualizar dados.")
             return 0
         
         # Validar apenas os campos que estão sendo atualizados contra o schema
+        field_types = self.schema._field_types
         for field_name, value in new_data.items():
-            if field_name in self.schema.fields:
-                expected_type = self.schema.fields[field_name]
-                if expected_type == "integer" and not isinstance(value, int):
-                    print(f"✗ Tipo inválido para o campo \'{field_name}\' (esperado inteiro, recebido {type(value).__name__})")
-                    return 0
-                if expected_type == "float" and not isinstance(value, float):
-                    print(f"✗ Tipo inválido para o campo \'{field_name}\' (esperado float, recebido {type(value).__name__})")
-                    return 0
-                if expected_type == "string" and not isinstance(value, str):
-                    print(f"✗ Tipo inválido para o campo \'{field_name}\' (esperado string, recebido {type(value).__name__})")
-                    return 0
-
-        updated_count = 0
-        for record in self._data_store:
-            match = all(record.get(k) == v for k, v in filters.items())
-            if match:
-                record.update(new_data)
-                updated_count += 1
+            expected = field_types.get(field_name)
+            if expected is not None and not isinstance(value, expected):
+                self._check_field_type(field_name, self.schema.fields[field_name], value)
+                return 0
+
+        # Índices afetados pela atualização (campos indexados presentes em new_data)
+        changed_indexes = [(name, index) for name, index in self._indexes.items() if name in new_data]
+        positions = self._find_positions(filters)
+        for pos in positions:
+            record = self._data_store[pos]
+            for name, index in changed_indexes:
+                self._unindex_value(index, record.get(name), pos)
+            record.update(new_data)
+            for name, index in changed_indexes:
+                insort(index.setdefault(record.get(name), []), pos)
+        updated_count = len(positions)
         
         if updated_count > 0:
+            self._bump_version()
             self._log_access("update", {"filters": filters, "new_data": new_data})
-            print(f"✓ {updated_count} registros atualizados no Data Product \'{self.metadata.name}\'")
+            logger.info("✓ %d registros atualizados no Data Product '%s'", updated_count, self.metadata.name)
         else:
-            print(f"ℹ️ Nenhum registro encontrado para atualizar com os filtros fornecidos no Data Product \'{self.metadata.name}\'")
+            logger.info("ℹ️ Nenhum registro encontrado para atualizar com os filtros fornecidos no Data Product '%s'", self.metadata.name)
         return updated_count
 
     def remove_data(self, filters: Dict[str, Any]) -> int: 
@@ -215,47 +445,133 @@ class DomainDataProduct:
         Registra a operação para auditoria.
         """
         if not filters:
-            print("✗ Erro: Filtros são obrigatórios para remover dados.")
+            logger.warning("✗ Erro: Filtros são obrigatórios para remover dados.")
             return 0
         
-        initial_count = len(self._data_store)
-        self._data_store = [record for record in self._data_store if not all(record.get(k) == v for k, v in filters.items())]
-        removed_count = initial_count - len(self._data_store)
+        removed_positions = set(self._find_positions(filters))
+        removed_count = len(removed_positions)
+        if removed_count:
+            self._data_store = [record for pos, record in enumerate(self._data_store) if pos not in removed_positions]
+            # As posições dos registros restantes mudam; os índices são reconstruídos
+            self._rebuild_indexes()
+            self._bump_version()
         
         if removed_count > 0:
             self._log_access("remove", filters)
-            print(f"✓ {removed_count} registros removidos do Data Product \'{self.metadata.name}\'")
+            logger.info("✓ %d registros removidos do Data Product '%s'", removed_count, self.metadata.name)
         else:
-            print(f"ℹ️ Nenhum registro encontrado para remover com os filtros fornecidos no Data Product \'{self.metadata.name}\'")
+            logger.info("ℹ️ Nenhum registro encontrado para remover com os filtros fornecidos no Data Product '%s'", self.metadata.name)
         
         return removed_count
 
+    def _bump_version(self) -> None:
+        """Marca os dados como alterados, invalidando as consultas memorizadas."""
+        self._version += 1
+        self._query_cache.clear()
+
+    def _index_record(self, pos: int, record: Dict[str, Any]) -> None:
+        """Registra a posição de um registro em todos os índices hash."""
+        for name, index in self._indexes.items():
+            index.setdefault(record.get(name), []).append(pos)
+
+    @staticmethod
+    def _unindex_value(index: Dict[Any, List[int]], value: Any, pos: int) -> None:
+        """Remove uma posição do bucket de um valor, descartando buckets vazios."""
+        bucket = index[value]
+        bucket.remove(pos)
+        if not bucket:
+            del index[value]
+
+    def _rebuild_indexes(self) -> None:
+        """Reconstrói todos os índices hash a partir de _data_store."""
+        for index in self._indexes.values():
+            index.clear()
+        for pos, record in enumerate(self._data_store):
+            self._index_record(pos, record)
+
+    def _find_positions(self, filters: Dict[str, Any]) -> List[int]:
+        """
+        Retorna as posições (em ordem) dos registros que satisfazem todos os filtros
+        de igualdade. Usa o bucket mais seletivo entre os campos indexados e
+        verifica apenas os filtros restantes nesses candidatos.
+        """
+        candidates = None
+        chosen = None
+        for name, value in filters.items():
+            index = self._indexes.get(name)
+            if index is None:
+                continue
+            try:
+                bucket = index.get(value, ())
+            except TypeError:  # valor não-hashable: não é possível usar o índice
+                continue
+            if candidates is None or len(bucket) < len(candidates):
+                candidates, chosen = bucket, name
+
+        if candidates is None:
+            residual = list(filters.items())
+        else:
+            # Todos os candidatos já satisfazem o termo do índice escolhido
+            residual = [(k, v) for k, v in filters.items() if k != chosen]
+            if not residual:
+                return list(candidates)
+
+        data_store = self._data_store
+        if all(type(k) is str for k, _ in residual):
+            # Campos ordenados: {a, b} e {b, a} compartilham o mesmo predicado compilado
+            residual.sort(key=lambda item: item[0])
+            match = _compile_filter(tuple(k for k, _ in residual))(*(v for _, v in residual))
+        else:
+            match = lambda record: all(record.get(k) == v for k, v in residual)
+        if candidates is None:
+            return [pos for pos, record in enumerate(data_store) if match(record)]
+        return [pos for pos in candidates if match(data_store[pos])]
+
     def _log_access(self, operation: str, params: Any = None):
         """Registra acessos ao Data Product para auditoria"""
-        log_entry = {
-            "timestamp": datetime.now(),
-            "operation": operation,
-            "params": params,
-            "data_product": self.metadata.name,
-            "version": self.metadata.version
-        }
-        self._access_log.append(log_entry)
-        print(f"[LOG] {log_entry['timestamp']}: Operação '{operation}' no Data Product '{self.metadata.name}' registrada.")
+        self._access_entries.append((time.time_ns(), operation, params, self.metadata.name, self.metadata.version))
+        self._access_count += 1
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[LOG] %s: Operação '%s' no Data Product '%s' registrada.", datetime.now(), operation, self.metadata.name)
+
+    def _flush_log(self) -> List[Dict[str, Any]]:
+        """Converte as entradas do buffer de acessos em dicts de log."""
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(timestamp_ns / 1e9),
+                "operation": operation,
+                "params": params,
+                "data_product": name,
+                "version": version
+            }
+            for timestamp_ns, operation, params, name, version in self._access_entries
+        ]
+
+    @property
+    def _access_log(self) -> List[Dict[str, Any]]:
+        """Log de acessos mais recentes (até ACCESS_LOG_SIZE entradas), como dicts."""
+        return self._flush_log()
+
+    @property
+    def _last_operation(self) -> Optional[str]:
+        """Operação do acesso mais recente, sem materializar o log (None se não houver)."""
+        return self._access_entries[-1][1] if self._access_entries else None
     
     def get_metrics(self) -> Dict[str, Any]:
         """
         Retorna métricas do Data Product.
         """
+        sla = self.sla
         return {
             "total_records": len(self._data_store),
-            "total_accesses": len(self._access_log),
+            "total_accesses": self._access_count,
             "status": self.metadata.status.value,
             "quality_level": self.metadata.quality_level.value,
             "sla": {
-                "availability": f"{self.sla.availability}%",
-                "freshness": f"{self.sla.freshness} min",
-                "completeness": f"{self.sla.completeness}%",
-                "accuracy": f"{self.sla.accuracy}%"
+                "availability": f"{sla.availability}%",
+                "freshness": f"{sla.freshness} min",
+                "completeness": f"{sla.completeness}%",
+                "accuracy": f"{sla.accuracy}%"
             }
         }
     
@@ -263,15 +579,19 @@ class DomainDataProduct:
         """
         Retorna informações de linhagem do Data Product.
         """
+        timestamps = (self.metadata.created_at, self.metadata.updated_at)
+        if self._timestamps_cache is None or self._timestamps_cache[0] != timestamps:
+            self._timestamps_cache = (timestamps, (timestamps[0].isoformat(), timestamps[1].isoformat()))
+        created_at, updated_at = self._timestamps_cache[1]
         return {
             "data_product": self.metadata.name,
             "version": self.metadata.version,
             "domain": self.metadata.domain,
             "owner": self.metadata.owner,
-            "created_at": self.metadata.created_at.isoformat(),
-            "updated_at": self.metadata.updated_at.isoformat(),
-            "upstream_dependencies": self._upstream_dependencies,
-            "downstream_consumers": self._downstream_consumers
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "upstream_dependencies": list(self._upstream_dependencies),
+            "downstream_consumers": list(self._downstream_consumers)
         }
     
     def add_dependency(self, data_product: 'DomainDataProduct') -> None:
@@ -283,8 +603,8 @@ class DomainDataProduct:
         """
         dep_name = data_product.metadata.name
         if dep_name not in self._upstream_dependencies:
-            self._upstream_dependencies.append(dep_name)
-            print(f"✓ Dependência adicionada: {self.metadata.name} -> {dep_name}")
+            self._upstream_dependencies[dep_name] = None
+            logger.info("✓ Dependência adicionada: %s -> %s", self.metadata.name, dep_name)
     
     def add_consumer(self, data_product: 'DomainDataProduct') -> None:
         """
@@ -295,8 +615,8 @@ class DomainDataProduct:
         """
         consumer_name = data_product.metadata.name
         if consumer_name not in self._downstream_consumers:
-            self._downstream_consumers.append(consumer_name)
-            print(f"✓ Consumidor adicionado: {consumer_name} -> {self.metadata.name}")
+            self._downstream_consumers[consumer_name] = None
+            logger.info("✓ Consumidor adicionado: %s -> %s", consumer_name, self.metadata.name)
     
     def load_data_from_json(self, filepath: str) -> int:
         """
@@ -309,29 +629,46 @@ class DomainDataProduct:
             Número de registros carregados com sucesso
         """
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                data_list = json.load(f)
+            with open(filepath, 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            logger.error("✗ Erro: Arquivo %s não encontrado", filepath)
+            return 0
+        except OSError as e:
+            logger.error("✗ Erro inesperado ao carregar %s: %s", filepath, e)
+            return 0
+        
+        return self.load_data_from_bytes(raw, source=filepath)
+
+    def load_data_from_bytes(self, raw: Any, source: str = "<bytes>") -> int:
+        """
+        Carrega dados de um documento JSON já em memória (lista de registros)
+        e os adiciona ao Data Product, sem passar pelo sistema de arquivos.
+        
+        Args:
+            raw: Documento JSON como bytes (ou str)
+            source: Origem dos dados, usada apenas nas mensagens de log
+            
+        Returns:
+            Número de registros carregados com sucesso
+        """
+        try:
+            data_list = _decode_json(raw)
             
             if not isinstance(data_list, list):
-                print(f"✗ Erro: Arquivo {filepath} não contém uma lista de registros")
+                logger.error("✗ Erro: %s não contém uma lista de registros", source)
                 return 0
             
-            loaded_count = 0
-            for data in data_list:
-                if self.add_data(data):
-                    loaded_count += 1
+            loaded_count, _ = self.add_many(data_list, log_summary=False)
             
-            print(f"✓ {loaded_count} de {len(data_list)} registros carregados de {filepath}")
+            logger.info("✓ %d de %d registros carregados de %s no Data Product '%s'", loaded_count, len(data_list), source, self.metadata.name)
             return loaded_count
             
-        except FileNotFoundError:
-            print(f"✗ Erro: Arquivo {filepath} não encontrado")
-            return 0
         except json.JSONDecodeError as e:
-            print(f"✗ Erro ao decodificar JSON de {filepath}: {e}")
+            logger.error("✗ Erro ao decodificar JSON de %s: %s", source, e)
             return 0
         except Exception as e:
-            print(f"✗ Erro inesperado ao carregar {filepath}: {e}")
+            logger.error("✗ Erro inesperado ao carregar %s: %s", source, e)
             return 0
 
 
@@ -363,11 +700,9 @@ def example_usage():
     # Carregar dados de vendas de um arquivo JSON
     sales_file_path = os.path.join(os.path.dirname(__file__), "..", "data", "sample_sales.json")
     if os.path.exists(sales_file_path):
-        with open(sales_file_path, "r") as f:
-            sample_sales_data = json.load(f)
+        sample_sales_data = _load_json_file(sales_file_path)
         print(f"Carregando {len(sample_sales_data)} registros de vendas de {sales_file_path}")
-        for data in sample_sales_data:
-            sales_product.add_data(data)
+        sales_product.add_many(sample_sales_data)
     else:
         print(f"✗ Arquivo de dados de vendas não encontrado: {sales_file_path}")
 
@@ -389,22 +724,22 @@ def example_usage():
     # Carregar dados de clientes de um arquivo JSON
     customers_file_path = os.path.join(os.path.dirname(__file__), "..", "data", "sample_customers.json")
     if os.path.exists(customers_file_path):
-        with open(customers_file_path, "r") as f:
-            sample_customer_data = json.load(f)
+        sample_customer_data = _load_json_file(customers_file_path)
         print(f"Carregando {len(sample_customer_data)} registros de clientes de {customers_file_path}")
-        for data in sample_customer_data:
-            customer_product.add_data(data)
+        customer_product.add_many(sample_customer_data)
     else:
         print(f"✗ Arquivo de dados de clientes não encontrado: {customers_file_path}")
 
-    # Criar segmentos dinamicamente
+    # Criar segmentos dinamicamente (constantes dos critérios calculadas uma única vez)
+    recent_threshold = datetime(2025, 10, 6)
+    no_interaction = datetime.min
     customer_product.create_segment(
         "high_value_customers",
         lambda c: c.get("lifetime_value", 0) > 3000 and c.get("tier") == "gold"
     )
     customer_product.create_segment(
         "recent_interactions",
-        lambda c: datetime.strptime(c.get("last_interaction", "2000-01-01 00:00:00"), "%Y-%m-%d %H:%M:%S") > datetime(2025, 10, 6)
+        lambda c: (customer_product.get_last_interaction(c) or no_interaction) > recent_threshold
     )
     print("\nCustomer Segment Statistics:")
     print(json.dumps(customer_product.get_segment_statistics(), indent=2))
@@ -415,11 +750,8 @@ def example_usage():
     print("\n" + "-" * 20 + " Inter-Data Product Interaction " + "-" * 20)
     print("Simulando a identificação de clientes de alto valor que fizeram compras recentes.")
     
-    high_value_customer_ids = set(customer_product.get_segment("high_value_customers"))
-    recent_interaction_customer_ids = set(customer_product.get_segment("recent_interactions"))
-
     # Clientes que são de alto valor E tiveram interações recentes
-    intersecting_customer_ids = list(high_value_customer_ids.intersection(recent_interaction_customer_ids))
+    intersecting_customer_ids = customer_product.intersect_segments("high_value_customers", "recent_interactions")
     
     print(f"\nClientes de Alto Valor com Interações Recentes (IDs): {intersecting_customer_ids}")
     if intersecting_customer_ids:
@@ -442,5 +774,6 @@ def example_usage():
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     example_usage()
 
@@ -8,16 +8,56 @@ Este módulo demonstra um produto de dados de vendas em uma arquitetura Data Mes
 utilizando o DomainDataProduct como base para gerenciamento de dados e metadados.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
+from calendar import monthrange
+from operator import itemgetter
+import heapq
 import json
-from collections import defaultdict
+import logging
+import re
+
+try:
+    import orjson  # Serializador JSON opcional (extra "fast")
+except ImportError:
+    orjson = None
 
 try:
     from .domain_data_product import DomainDataProduct, DataProductMetadata, DataSchema, DataProductSLA, DataProductStatus, DataQualityLevel
 except ImportError:
     from domain_data_product import DomainDataProduct, DataProductMetadata, DataSchema, DataProductSLA, DataProductStatus, DataQualityLevel
 
+logger = logging.getLogger(__name__)
+
+
+# Campos obrigatórios de um registro de venda
+_REQUIRED_FIELDS = frozenset(("transaction_id", "product_id", "customer_id", "amount", "date", "product_category", "region"))
+
+# Campos do registro de venda usados nas métricas agregadas
+_METRIC_FIELDS = ("amount", "product_category", "region", "customer_id")
+
+# Datas no formato YYYY-MM-DD (mês e dia com 1 ou 2 dígitos, como aceito pelo strptime)
+_DATE_RE = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})")
+
+
+def _dumps(obj: Any) -> str:
+    """Serializa obj como JSON indentado, usando orjson quando disponível."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _is_valid_date(value: Any) -> bool:
+    """
+    Verifica se value é uma data YYYY-MM-DD válida sem usar strptime
+    (e sem exceções no caminho de datas inválidas).
+    """
+    match = _DATE_RE.fullmatch(value) if isinstance(value, str) else None
+    if match is None:
+        return False
+    year, month, day = int(match[1]), int(match[2]), int(match[3])
+    return year >= 1 and 1 <= month <= 12 and 1 <= day <= monthrange(year, month)[1]
+
 
 class SalesDataProduct(DomainDataProduct):
     """
@@ -53,7 +93,7 @@ class SalesDataProduct(DomainDataProduct):
                 "region": "string"
             },
             primary_key="transaction_id",
-            indexes=["product_id", "customer_id", "date"]
+            indexes=["product_id", "customer_id", "date", "product_category", "region"]
         )
         
         # Definir SLA para vendas
@@ -65,99 +105,155 @@ class SalesDataProduct(DomainDataProduct):
         )
         
         super().__init__(metadata, schema, sla)
-        self._sales_metrics: Dict[str, Any] = {}
-        self._update_sales_metrics() # Inicializa as métricas
-
-    def add_data(self, sale_data: Dict[str, Any]) -> bool:
+        self._field_names = tuple(self.schema.fields)
+        # Acumuladores das métricas, mantidos incrementalmente a cada alteração.
+        # Receitas em centavos inteiros: somas e subtrações exatas, sem erro de ponto flutuante
+        self._total_revenue_cents = 0
+        self._total_transactions = 0
+        self._revenue_by: Dict[str, Dict[Any, List]] = {
+            "product_category": {},
+            "region": {},
+            "customer_id": {}
+        }
+        self._metrics_updated_at = datetime.now()
+        # Índice da chave primária (transaction_id -> posições) mantido pela classe base,
+        # usado para checar unicidade em O(1)
+        self._tx_id_index = self._indexes["transaction_id"]
+        # Último relatório de qualidade, associado à versão dos dados e aos alvos de SLA
+        self._quality_report_cache: Optional[Tuple[Tuple[Any, ...], Dict[str, Any]]] = None
+
+    def add_data(self, sale_data: Dict[str, Any], *, validate: bool = True) -> bool:
         """
         Adiciona dados de venda ao Data Product, com validações adicionais.
         """
-        if not self._validate_sale_data(sale_data):
-            print(f"✗ Falha ao adicionar dados: Validação de dados de venda falhou para {sale_data.get('transaction_id', 'N/A')}")
+        if validate and not self._validate_sale_data(sale_data):
+            logger.warning("✗ Falha ao adicionar dados: Validação de dados de venda falhou para %s", sale_data.get('transaction_id', 'N/A'))
             return False
         
-        if not super().add_data(sale_data):
+        if not super().add_data(sale_data, validate=validate):
             return False
         
-        self._update_sales_metrics()
+        self._apply_delta(sale_data)
         return True
 
+    def update_data(self, filters: Dict[str, Any], new_data: Dict[str, Any]) -> int:
+        """
+        Atualiza vendas existentes, ajustando as métricas apenas pelos registros alterados.
+        """
+        touches_metrics = filters and any(k in new_data for k in _METRIC_FIELDS)
+        affected = [self._data_store[pos] for pos in self._find_positions(filters)] if touches_metrics else []
+        # Valores anteriores dos campos que alimentam as métricas
+        previous = [{k: record[k] for k in _METRIC_FIELDS if k in record} for record in affected]
+
+        updated_count = super().update_data(filters, new_data)
+        if updated_count > 0:
+            for old_values, record in zip(previous, affected):
+                self._apply_delta(old_values, -1)
+                self._apply_delta(record)
+        return updated_count
+
+    def remove_data(self, filters: Dict[str, Any]) -> int:
+        """
+        Remove vendas, descontando das métricas apenas os registros removidos.
+        """
+        removed = [self._data_store[pos] for pos in self._find_positions(filters)] if filters else []
+
+        removed_count = super().remove_data(filters)
+        if removed_count > 0:
+            for record in removed:
+                self._apply_delta(record, -1)
+        return removed_count
+
+    def _on_record_added(self, sale_data: Dict[str, Any]) -> None:
+        self._apply_delta(sale_data)
+
+    def _validate_record(self, sale_data: Dict[str, Any]) -> bool:
+        return self._validate_sale_data(sale_data) and super()._validate_record(sale_data)
+
+    def _check_storable(self, sale_data: Dict[str, Any]) -> bool:
+        # As métricas incrementais (_apply_delta) precisam de um amount numérico,
+        # inclusive em cargas com validate=False
+        amount = sale_data.get("amount")
+        if not isinstance(amount, (int, float)):
+            logger.warning("✗ Valor de 'amount' inválido para %s. Deve ser numérico.", amount)
+            return False
+        return super()._check_storable(sale_data)
+
     def _validate_sale_data(self, sale_data: Dict[str, Any]) -> bool:
         """
         Valida dados de venda específicos, além do schema básico.
         """
         # Validação de campos obrigatórios (já coberto pelo schema, mas reforça)
-        required_fields = ["transaction_id", "product_id", "customer_id", "amount", "date", "product_category", "region"]
-        if not all(field in sale_data for field in required_fields):
-            print(f"✗ Dados de venda incompletos. Campos obrigatórios: {required_fields}")
+        if not _REQUIRED_FIELDS.issubset(sale_data):
+            logger.warning("✗ Dados de venda incompletos. Campos obrigatórios: %s", sorted(_REQUIRED_FIELDS))
             return False
         
         # Validação de formato de data
-        try:
-            datetime.strptime(sale_data["date"], "%Y-%m-%d")
-        except ValueError:
-            print(f"✗ Formato de data inválido para {sale_data['date']}. Esperado YYYY-MM-DD.")
+        if not _is_valid_date(sale_data["date"]):
+            logger.warning("✗ Formato de data inválido para %s. Esperado YYYY-MM-DD.", sale_data['date'])
             return False
 
         # Validação de valor de amount
         if not isinstance(sale_data["amount"], (int, float)) or sale_data["amount"] <= 0:
-            print(f"✗ Valor de 'amount' inválido para {sale_data['amount']}. Deve ser um número positivo.")
+            logger.warning("✗ Valor de 'amount' inválido para %s. Deve ser um número positivo.", sale_data['amount'])
             return False
         
         # Validação de unicidade de transaction_id (exemplo simples, em produção usaria um DB)
-        if any(record["transaction_id"] == sale_data["transaction_id"] for record in self._data_store):
-            print(f"✗ transaction_id {sale_data['transaction_id']} já existe. Transações devem ser únicas.")
+        try:
+            duplicate = sale_data["transaction_id"] in self._tx_id_index
+        except TypeError:  # id não-hashable: será rejeitado pela validação de schema
+            duplicate = False
+        if duplicate:
+            logger.warning("✗ transaction_id %s já existe. Transações devem ser únicas.", sale_data['transaction_id'])
             return False
 
         return True
 
-    def _update_sales_metrics(self) -> None:
+    def _apply_delta(self, sale: Dict[str, Any], sign: int = 1) -> None:
         """
-        Atualiza as métricas de vendas do produto de dados.
+        Aplica (sign=1) ou desfaz (sign=-1) a contribuição de uma venda nos
+        acumuladores das métricas, sem varrer os demais registros.
         """
-        if not self._data_store:
-            self._sales_metrics = {
-                "total_revenue": 0.0,
-                "total_transactions": 0,
-                "average_transaction_value": 0.0,
-                "sales_by_category": {},
-                "sales_by_region": {},
-                "top_customers_by_revenue": [],
-                "last_metrics_update": datetime.now().isoformat()
-            }
-            return
-        
-        total_revenue = sum(sale["amount"] for sale in self._data_store)
-        total_transactions = len(self._data_store)
-        average_transaction_value = total_revenue / total_transactions if total_transactions > 0 else 0
-        
-        sales_by_category = defaultdict(float)
-        sales_by_region = defaultdict(float)
-        customer_revenue = defaultdict(float)
-
-        for sale in self._data_store:
-            sales_by_category[sale.get("product_category", "Unknown")] += sale["amount"]
-            sales_by_region[sale.get("region", "Unknown")] += sale["amount"]
-            customer_revenue[sale.get("customer_id", "Unknown")] += sale["amount"]
+        cents = sign * round(sale["amount"] * 100)
+        self._total_revenue_cents += cents
+        self._total_transactions += sign
+        for field_name, groups in self._revenue_by.items():
+            key = sale.get(field_name, "Unknown")
+            entry = groups.get(key)
+            if entry is None:
+                entry = groups[key] = [0, 0]  # [receita em centavos, nº de transações]
+            entry[0] += cents
+            entry[1] += sign
+            if entry[1] == 0:
+                del groups[key]
+        self._metrics_updated_at = datetime.now()
+
+    def get_sales_metrics(self) -> Dict[str, Any]:
+        """
+        Retorna as métricas de vendas do produto de dados, derivadas dos
+        acumuladores mantidos incrementalmente.
+        """
+        total_revenue = self._total_revenue_cents / 100
+        total_transactions = self._total_transactions
+        average_transaction_value = total_revenue / total_transactions if total_transactions > 0 else 0.0
         
-        top_customers = sorted(customer_revenue.items(), key=lambda item: item[1], reverse=True)[:5]
+        customer_revenue = self._revenue_by["customer_id"]
+        top_customers = heapq.nlargest(
+            5,
+            ((customer_id, entry[0] / 100) for customer_id, entry in customer_revenue.items()),
+            key=itemgetter(1)
+        )
 
-        self._sales_metrics = {
+        return {
             "total_revenue": round(total_revenue, 2),
             "total_transactions": total_transactions,
             "average_transaction_value": round(average_transaction_value, 2),
-            "sales_by_category": dict(sales_by_category),
-            "sales_by_region": dict(sales_by_region),
+            "sales_by_category": {key: entry[0] / 100 for key, entry in self._revenue_by["product_category"].items()},
+            "sales_by_region": {key: entry[0] / 100 for key, entry in self._revenue_by["region"].items()},
             "top_customers_by_revenue": top_customers,
-            "last_metrics_update": datetime.now().isoformat()
+            "last_metrics_update": self._metrics_updated_at.isoformat()
         }
     
-    def get_sales_metrics(self) -> Dict[str, Any]:
-        """
-        Retorna as métricas de vendas do produto de dados.
-        """
-        return self._sales_metrics
-    
     def get_sales_by_product_category(self, category: str) -> List[Dict[str, Any]]:
         """
         Retorna todas as vendas de uma categoria de produto específica.
@@ -173,46 +269,60 @@ class SalesDataProduct(DomainDataProduct):
     def get_data_quality_report(self) -> Dict[str, Any]:
         """
         Gera um relatório de qualidade de dados mais detalhado.
+        O relatório é recalculado apenas quando os dados (ou o SLA) mudam.
         """
+        cache_key = (self._version, self.sla.completeness, self.sla.accuracy)
+        if self._quality_report_cache is None or self._quality_report_cache[0] != cache_key:
+            self._quality_report_cache = (cache_key, self._compute_data_quality_report())
+        # Cópia rasa (e dos dicts de cada verificação, cujos valores são escalares)
+        # para que alterações feitas pelo chamador não afetem o cache
+        report = self._quality_report_cache[1]
+        return {k: dict(v) if isinstance(v, dict) else v for k, v in report.items()}
+
+    def _compute_data_quality_report(self) -> Dict[str, Any]:
+        """Calcula o relatório de qualidade de dados a partir dos registros."""
         report = super().get_metrics() # Usa métricas básicas do DomainDataProduct
         
         total_records = report.get("total_records", 0)
         if total_records == 0:
             return {"message": "No data to generate quality report."}
 
-        # Contagem de valores nulos por campo
-        null_counts = defaultdict(int)
+        # Uma única passada sobre os registros acumulando todas as contagens:
+        # valores nulos por campo, amounts fora do range e datas inválidas
+        field_names = self._field_names
+        schema_fields = frozenset(field_names)
+        null_counts = dict.fromkeys(field_names, 0)
+        invalid_amounts = 0
+        invalid_dates = 0
+        number_types = (int, float)
+        is_valid_date = _is_valid_date
         for record in self._data_store:
-            for field_name in self.schema.fields.keys():
-                if record.get(field_name) is None or record.get(field_name) == "":
+            get = record.get
+            for field_name in schema_fields - record.keys():
+                null_counts[field_name] += 1
+            for field_name, value in record.items():
+                if (value is None or value == "") and field_name in schema_fields:
                     null_counts[field_name] += 1
+            amount = get("amount")
+            if not (isinstance(amount, number_types) and amount > 0):
+                invalid_amounts += 1
+            if not is_valid_date(get("date")):
+                invalid_dates += 1 # Datas nulas também contam como inválidas
         
         completeness_by_field = {
             field: round((1 - null_counts[field] / total_records) * 100, 2)
-            for field in self.schema.fields.keys()
+            for field in field_names
         }
 
         # Validação de unicidade para transaction_id
-        transaction_ids = [record["transaction_id"] for record in self._data_store if "transaction_id" in record]
-        unique_transaction_ids = len(set(transaction_ids))
+        unique_transaction_ids = len(self._tx_id_index) - (None in self._tx_id_index)
         duplicate_transactions = total_records - unique_transaction_ids
         uniqueness_rate = round((unique_transaction_ids / total_records) * 100, 2)
 
         # Validação de range para 'amount'
-        invalid_amounts = sum(1 for record in self._data_store if not (isinstance(record.get("amount"), (int, float)) and record["amount"] > 0))
         amount_validity_rate = round((1 - invalid_amounts / total_records) * 100, 2)
 
         # Validação de formato de data
-        invalid_dates = 0
-        for record in self._data_store:
-            date_str = record.get("date")
-            if date_str:
-                try:
-                    datetime.strptime(date_str, "%Y-%m-%d")
-                except ValueError:
-                    invalid_dates += 1
-            else:
-                invalid_dates += 1 # Considerar nulo como inválido para este check
         date_validity_rate = round((1 - invalid_dates / total_records) * 100, 2)
 
         # Comparar com SLA
@@ -245,6 +355,7 @@ class SalesDataProduct(DomainDataProduct):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     print("=" * 80)
     print("Sales Data Product - Advanced Example")
     print("=" * 80)
@@ -300,14 +411,13 @@ if __name__ == "__main__":
         } # transaction_id duplicado
     ]
     
-    for data in sample_sales_data:
-        sales_product.add_data(data)
+    sales_product.add_many(sample_sales_data)
     
     print("\n" + "=" * 30 + " Sales Metrics " + "=" * 30)
-    print(json.dumps(sales_product.get_sales_metrics(), indent=2))
+    print(_dumps(sales_product.get_sales_metrics()))
     
     print("\n" + "=" * 30 + " Data Quality Report " + "=" * 24)
-    print(json.dumps(sales_product.get_data_quality_report(), indent=2))
+    print(_dumps(sales_product.get_data_quality_report()))
 
     print("\n" + "=" * 30 + " Query Examples " + "=" * 30)
     # Consultar vendas por categoria
@@ -0,0 +1,13 @@
+"""
+Configuração compartilhada dos testes
+Author: Gabriel Demetrios Lafis
+Year: 2025
+"""
+
+import sys
+from pathlib import Path
+
+# Adicionar a raiz do projeto ao path (uma única vez) para importar o pacote src
+_ROOT = str(Path(__file__).resolve().parent.parent)
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
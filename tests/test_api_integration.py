@@ -5,40 +5,64 @@ Year: 2025
 """
 
 import unittest
-import sys
 import os
-from unittest.mock import Mock, patch, MagicMock
+import sys
+import json
+from unittest.mock import Mock, patch
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Execução direta (python tests/<arquivo>.py): sem o conftest.py do pytest,
+# a raiz do projeto precisa ser adicionada ao path para importar o pacote src
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 from src.api_integration import WorldBankAPIIntegration, ExternalDataEnricher
 
 
+def _mock_json_response(payload):
+    """Cria um Mock de resposta HTTP com o payload JSON informado"""
+    mock_response = Mock()
+    mock_response.json.return_value = payload
+    mock_response.content = json.dumps(payload).encode()
+    mock_response.raise_for_status = Mock()
+    mock_response.status_code = 200
+    mock_response.headers = {}
+    return mock_response
+
 class TestWorldBankAPIIntegration(unittest.TestCase):
     """Testes para a classe WorldBankAPIIntegration"""
     
+    @classmethod
+    def setUpClass(cls):
+        """Cria uma única instância (sessão e pool de conexões) para toda a classe"""
+        cls.wb_api = WorldBankAPIIntegration()
+    
     def setUp(self):
-        """Configuração executada antes de cada teste"""
-        self.wb_api = WorldBankAPIIntegration()
+        """Isola o cache compartilhado entre os testes"""
+        self.wb_api.clear_cache()
     
     def test_initialization(self):
         """Testa se a API é inicializada corretamente"""
         self.assertIsNotNone(self.wb_api.session)
         self.assertEqual(self.wb_api.BASE_URL, "https://api.worldbank.org/v2")
     
+    def test_session_adapter_configuration(self):
+        """Testa se a sessão usa pool de conexões ampliado e retry automático"""
+        adapter = self.wb_api.session.get_adapter(self.wb_api.BASE_URL)
+        self.assertEqual(adapter._pool_maxsize, 64)
+        self.assertEqual(adapter.max_retries.total, 3)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+    
     @patch('src.api_integration.requests.Session.get')
     def test_get_countries_success(self, mock_get):
         """Testa obtenção de países com sucesso"""
         # Mock da resposta da API
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response = _mock_json_response([
             {"page": 1, "pages": 1, "per_page": 50, "total": 2},
             [
                 {"id": "BRA", "name": "Brazil", "region": {"value": "Latin America"}},
                 {"id": "USA", "name": "United States", "region": {"value": "North America"}}
             ]
-        ]
-        mock_response.raise_for_status = Mock()
+        ])
         mock_get.return_value = mock_response
         
         countries = self.wb_api.get_countries(per_page=50)
@@ -60,15 +84,13 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
     @patch('src.api_integration.requests.Session.get')
     def test_get_indicators_success(self, mock_get):
         """Testa obtenção de indicadores com sucesso"""
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response = _mock_json_response([
             {"page": 1, "pages": 1, "per_page": 20, "total": 2},
             [
                 {"id": "NY.GDP.MKTP.CD", "name": "GDP (current US$)"},
                 {"id": "SP.POP.TOTL", "name": "Population, total"}
             ]
-        ]
-        mock_response.raise_for_status = Mock()
+        ])
         mock_get.return_value = mock_response
         
         indicators = self.wb_api.get_indicators(per_page=20)
@@ -79,15 +101,13 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
     @patch('src.api_integration.requests.Session.get')
     def test_get_indicators_with_search(self, mock_get):
         """Testa obtenção de indicadores com filtro de busca"""
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response = _mock_json_response([
             {"page": 1, "pages": 1, "per_page": 20, "total": 2},
             [
                 {"id": "NY.GDP.MKTP.CD", "name": "GDP (current US$)"},
                 {"id": "SP.POP.TOTL", "name": "Population, total"}
             ]
-        ]
-        mock_response.raise_for_status = Mock()
+        ])
         mock_get.return_value = mock_response
         
         indicators = self.wb_api.get_indicators(search_term="GDP", per_page=20)
@@ -95,11 +115,31 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
         self.assertEqual(len(indicators), 1)
         self.assertEqual(indicators[0]["id"], "NY.GDP.MKTP.CD")
     
+    @patch('src.api_integration.requests.Session.get')
+    def test_get_indicators_search_paginates(self, mock_get):
+        """Testa se a busca percorre as páginas seguintes do catálogo"""
+        pages = {
+            1: _mock_json_response([
+                {"page": 1, "pages": 2, "per_page": 1000, "total": 2},
+                [{"id": "SP.POP.TOTL", "name": "Population, total"}]
+            ]),
+            2: _mock_json_response([
+                {"page": 2, "pages": 2, "per_page": 1000, "total": 2},
+                [{"id": "NY.GDP.MKTP.CD", "name": "GDP (current US$)"}]
+            ])
+        }
+        mock_get.side_effect = lambda url, params=None, **kwargs: pages[params['page']]
+        
+        indicators = self.wb_api.get_indicators(search_term="gdp", per_page=5)
+        
+        self.assertEqual(len(indicators), 1)
+        self.assertEqual(indicators[0]["id"], "NY.GDP.MKTP.CD")
+        self.assertEqual(mock_get.call_count, 2)
+    
     @patch('src.api_integration.requests.Session.get')
     def test_get_country_data_success(self, mock_get):
         """Testa obtenção de dados de país com sucesso"""
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response = _mock_json_response([
             {"page": 1, "pages": 1, "per_page": 100, "total": 2},
             [
                 {
@@ -115,8 +155,7 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
                     "date": "2021"
                 }
             ]
-        ]
-        mock_response.raise_for_status = Mock()
+        ])
         mock_get.return_value = mock_response
         
         data = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
@@ -124,11 +163,31 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
         self.assertEqual(len(data), 2)
         self.assertEqual(data[0]["value"], 1000000000)
     
+    @patch('src.api_integration.requests.Session.get')
+    def test_malformed_json_body_returns_empty(self, mock_get):
+        """Testa se um corpo 200 que não é JSON é tratado nos dois caminhos de decodificação"""
+        import requests
+        import src.api_integration as api_module
+        
+        def malformed_response(*args, **kwargs):
+            response = requests.Response()
+            response.status_code = 200
+            response._content = b"<html>Service Unavailable</html>"
+            return response
+        mock_get.side_effect = malformed_response
+        
+        decoders = [("stdlib", None)] + ([("orjson", api_module.orjson)] if api_module.orjson else [])
+        for label, decoder in decoders:
+            with self.subTest(label), patch('src.api_integration.orjson', decoder):
+                self.wb_api.clear_cache()
+                self.assertEqual(self.wb_api.get_countries(), [])
+                self.assertEqual(self.wb_api.get_indicators(), [])
+                self.assertEqual(self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD"), [])
+    
     @patch('src.api_integration.requests.Session.get')
     def test_get_country_data_with_year_range(self, mock_get):
         """Testa obtenção de dados com range de anos"""
-        mock_response = Mock()
-        mock_response.json.return_value = [
+        mock_response = _mock_json_response([
             {"page": 1, "pages": 1, "per_page": 100, "total": 1},
             [
                 {
@@ -138,8 +197,7 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
                     "date": "2022"
                 }
             ]
-        ]
-        mock_response.raise_for_status = Mock()
+        ])
         mock_get.return_value = mock_response
         
         data = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD", start_year=2020, end_year=2022)
@@ -147,23 +205,159 @@ class TestWorldBankAPIIntegration(unittest.TestCase):
         self.assertIsNotNone(data)
         mock_get.assert_called_once()
     
+    @patch('src.api_integration.requests.Session.get')
+    def test_get_country_data_uses_cache(self, mock_get):
+        """Testa se chamadas repetidas reutilizam a resposta em cache"""
+        mock_response = _mock_json_response([
+            {"page": 1, "pages": 1, "per_page": 100, "total": 1},
+            [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
+        ])
+        mock_get.return_value = mock_response
+        
+        first = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        second = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+        
+        self.wb_api.clear_cache()
+        self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        self.assertEqual(mock_get.call_count, 2)
+    
+    @patch('src.api_integration.requests.Session.get')
+    def test_mutating_result_does_not_corrupt_cache(self, mock_get):
+        """Testa se alterar o resultado de uma chamada não afeta as chamadas seguintes"""
+        mock_get.return_value = _mock_json_response([
+            {"page": 1, "pages": 1, "per_page": 100, "total": 1},
+            [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
+        ])
+        
+        first = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        first[0]["value"] = None
+        first[0]["country"]["value"] = "Changed"
+        first.clear()
+        second = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        
+        self.assertEqual(second, [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}])
+        mock_get.assert_called_once()
+    
+    @patch('src.api_integration.requests.Session.get')
+    def test_expired_cache_revalidates_with_etag(self, mock_get):
+        """Testa se uma entrada expirada é revalidada com If-None-Match"""
+        payload = [
+            {"page": 1, "pages": 1, "per_page": 100, "total": 1},
+            [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
+        ]
+        first_response = _mock_json_response(payload)
+        first_response.headers = {"ETag": '"abc123"'}
+        not_modified = Mock(status_code=304)
+        mock_get.side_effect = [first_response, not_modified]
+        
+        self.wb_api.CACHE_TTL = 0  # Expira imediatamente
+        self.addCleanup(delattr, self.wb_api, "CACHE_TTL")
+        first = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        second = self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD")
+        
+        self.assertEqual(first, second)
+        self.assertEqual(mock_get.call_count, 2)
+        self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"abc123"'})
+    
+    @patch('src.api_integration.requests.Session.get')
+    def test_concurrent_identical_requests_are_coalesced(self, mock_get):
+        """Testa se chamadas simultâneas para a mesma URL geram uma única requisição"""
+        import threading
+        started = threading.Event()
+        release = threading.Event()
+        
+        def slow_response(*args, **kwargs):
+            started.set()
+            release.wait(timeout=5)
+            return _mock_json_response([
+                {"page": 1, "pages": 1, "per_page": 100, "total": 1},
+                [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
+            ])
+        
+        mock_get.side_effect = slow_response
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD"))
+        )
+        first.start()
+        started.wait(timeout=5)
+        second = threading.Thread(
+            target=lambda: results.append(self.wb_api.get_country_data("BRA", "NY.GDP.MKTP.CD"))
+        )
+        second.start()
+        release.set()
+        first.join()
+        second.join()
+        
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0], results[1])
+        mock_get.assert_called_once()
+    
+    @patch('src.api_integration.requests.Session.get')
+    def test_disk_cache_persists_between_instances(self, mock_get):
+        """Testa se respostas persistidas em disco são reutilizadas por outra instância"""
+        import tempfile
+        mock_get.return_value = _mock_json_response([
+            {"page": 1, "pages": 1, "per_page": 100, "total": 1},
+            [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
+        ])
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = WorldBankAPIIntegration(cache_dir=cache_dir).get_country_data("BRA", "NY.GDP.MKTP.CD")
+            second = WorldBankAPIIntegration(cache_dir=cache_dir).get_country_data("BRA", "NY.GDP.MKTP.CD")
+        
+        self.assertEqual(first, second)
+        mock_get.assert_called_once()
+    
     @patch('src.api_integration.requests.Session.get')
     def test_get_multiple_countries_data(self, mock_get):
-        """Testa obtenção de dados para múltiplos países"""
-        def mock_response_func(*args, **kwargs):
-            mock_response = Mock()
-            if 'BRA' in args[0]:
-                mock_response.json.return_value = [
-                    {},
-                    [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
-                ]
-            elif 'USA' in args[0]:
-                mock_response.json.return_value = [
-                    {},
-                    [{"value": 2000, "date": "2022", "country": {"value": "United States"}}]
-                ]
-            mock_response.raise_for_status = Mock()
-            return mock_response
+        """Testa obtenção de dados para múltiplos países em uma única requisição"""
+        mock_get.return_value = _mock_json_response([
+            {"page": 1, "pages": 1, "per_page": 1000, "total": 2},
+            [
+                {"value": 1000, "date": "2022", "countryiso3code": "BRA",
+                 "country": {"id": "BR", "value": "Brazil"}},
+                {"value": 2000, "date": "2022", "countryiso3code": "USA",
+                 "country": {"id": "US", "value": "United States"}}
+            ]
+        ])
+        
+        results = self.wb_api.get_multiple_countries_data(
+            ["BRA", "USA"],
+            "NY.GDP.MKTP.CD",
+            year=2022
+        )
+        
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results["BRA"]["value"], 1000)
+        self.assertEqual(results["USA"]["value"], 2000)
+        mock_get.assert_called_once()
+        self.assertIn("BRA;USA", mock_get.call_args[0][0])
+    
+    @patch('src.api_integration.requests.Session.get')
+    def test_get_multiple_countries_data_fallback(self, mock_get):
+        """Testa o fallback para requisições individuais quando o lote falha"""
+        import requests
+        responses = {
+            "BRA": _mock_json_response([
+                {},
+                [{"value": 1000, "date": "2022", "country": {"value": "Brazil"}}]
+            ]),
+            "USA": _mock_json_response([
+                {},
+                [{"value": 2000, "date": "2022", "country": {"value": "United States"}}]
+            ])
+        }
+        
+        def mock_response_func(url, *args, **kwargs):
+            # URL no formato .../country/{países}/indicator/{indicador}
+            countries = url.split('/country/', 1)[1].split('/', 1)[0]
+            if ';' in countries:
+                raise requests.exceptions.RequestException("Batch Error")
+            return responses[countries]
         
         mock_get.side_effect = mock_response_func
         
@@ -243,7 +437,7 @@ if __name__ == "__main__":
     print("Executando testes do módulo de integração com APIs")
     print("=" * 80)
     
-    runner = unittest.TextTestRunner(verbosity=2)
+    runner = unittest.TextTestRunner(buffer=True)
     suite = unittest.TestSuite()
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestWorldBankAPIIntegration))
     suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestExternalDataEnricher))
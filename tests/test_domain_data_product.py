@@ -6,13 +6,16 @@ Year: 2025
 """
 
 import unittest
-import sys
+import json
 import os
+import sys
+from dataclasses import asdict
 from datetime import datetime
-import json
 
-# Adicionar o diretório src ao path para importar os módulos
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Execução direta (python tests/<arquivo>.py): sem o conftest.py do pytest,
+# a raiz do projeto precisa ser adicionada ao path para importar o pacote src
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
 from src.domain_data_product import (
     DomainDataProduct,
@@ -20,56 +23,85 @@ from src.domain_data_product import (
     DataSchema,
     DataProductSLA,
     DataProductStatus,
-    DataQualityLevel
+    DataQualityLevel,
+    _compile_filter
 )
 from src.sales_data_product import SalesDataProduct
 from src.customer_data_product import CustomerDataProduct
 
 
+# Registros iniciais usados nos testes de query/update/remove
+_INITIAL_ROWS = (
+    {"id": "001", "value": 100, "name": "Item A"},
+    {"id": "002", "value": 200, "name": "Item B"},
+    {"id": "003", "value": 150, "name": "Item C"}
+)
+
+
+def _make_schema_and_sla():
+    """Schema e SLA do Data Product de teste (não são alterados pelos testes)"""
+    schema = DataSchema(
+        fields={
+            "id": "string",
+            "value": "integer",
+            "name": "string"
+        },
+        primary_key="id"
+    )
+    
+    sla = DataProductSLA(
+        availability=99.5,
+        freshness=10,
+        completeness=95.0,
+        accuracy=98.0
+    )
+    
+    return schema, sla
+
+
+def _make_product(schema, sla):
+    """Cria o Data Product de teste pré-carregado com cópias de _INITIAL_ROWS"""
+    # Metadados novos a cada produto: publish() altera o status
+    metadata = DataProductMetadata(
+        name="test-product",
+        version="1.0.0",
+        domain="test-domain",
+        owner="test@example.com",
+        description="Test data product",
+        tags=["test"],
+        quality_level=DataQualityLevel.SILVER
+    )
+    
+    data_product = DomainDataProduct(metadata, schema, sla)
+    # Registros já sabidamente válidos (ver test_initial_rows_match_schema); add_many guarda cópias
+    data_product.add_many(_INITIAL_ROWS, validate=False)
+    return data_product
+
+
 class TestDomainDataProduct(unittest.TestCase):
-    """Testes para a classe DomainDataProduct"""
+    """Testes para a classe DomainDataProduct que alteram o Data Product"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Schema e SLA construídos uma única vez para a classe"""
+        cls.schema, cls.sla = _make_schema_and_sla()
     
     def setUp(self):
         """Configuração executada antes de cada teste"""
-        self.metadata = DataProductMetadata(
-            name="test-product",
-            version="1.0.0",
-            domain="test-domain",
-            owner="test@example.com",
-            description="Test data product",
-            tags=["test"],
-            quality_level=DataQualityLevel.SILVER
-        )
-        
-        self.schema = DataSchema(
-            fields={
-                "id": "string",
-                "value": "integer",
-                "name": "string"
-            },
-            primary_key="id"
-        )
-        
-        self.sla = DataProductSLA(
-            availability=99.5,
-            freshness=10,
-            completeness=95.0,
-            accuracy=98.0
-        )
-        
-        self.data_product = DomainDataProduct(self.metadata, self.schema, self.sla)
-
-        # Adicionar alguns dados iniciais para testes de update/remove
-        self.data_product.add_data({"id": "001", "value": 100, "name": "Item A"})
-        self.data_product.add_data({"id": "002", "value": 200, "name": "Item B"})
-        self.data_product.add_data({"id": "003", "value": 150, "name": "Item C"})
+        self.data_product = _make_product(self.schema, self.sla)
+        self.metadata = self.data_product.metadata
     
-    def test_initialization(self):
-        """Testa se o Data Product é inicializado corretamente"""
-        self.assertEqual(self.data_product.metadata.name, "test-product")
-        self.assertEqual(self.data_product.metadata.status, DataProductStatus.DRAFT)
-        self.assertEqual(len(self.data_product._data_store), 3)
+    def tearDown(self):
+        """Libera o Data Product (a suíte mantém as instâncias de teste até o fim)"""
+        self.data_product = None
+        self.metadata = None
     
+    def test_initial_rows_match_schema(self):
+        """Testa se os registros carregados sem validação por _make_product são válidos"""
+        for row in _INITIAL_ROWS:
+            with self.subTest(row["id"]):
+                self.assertTrue(self.data_product._validate_data_schema(row))
+
     def test_add_valid_data(self):
         """Testa a adição de dados válidos"""
         data = {"id": "004", "value": 250, "name": "Item D"}
@@ -91,6 +123,12 @@ class TestDomainDataProduct(unittest.TestCase):
         self.assertFalse(result)
         self.assertEqual(len(self.data_product._data_store), 3)
     
+    def test_add_many_without_validation(self):
+        """Testa a adição em lote de fonte confiável, sem validação"""
+        records = [{"id": "004", "value": 250, "name": "Item D"}, {"id": "005", "value": "300", "name": "Item E"}]
+        self.assertEqual(self.data_product.add_many(records, validate=False), (2, 0))
+        self.assertEqual(self.data_product.query({"id": "005"})[0]["value"], "300")
+
     def test_publish_valid_product(self):
         """Testa a publicação de um Data Product válido"""
         result = self.data_product.publish()
@@ -119,20 +157,70 @@ class TestDomainDataProduct(unittest.TestCase):
         self.assertFalse(result)
         self.assertEqual(invalid_product.metadata.status, DataProductStatus.DRAFT)
     
-    def test_query_all_data(self):
-        """Testa a consulta de todos os dados"""
-        results = self.data_product.query()
-        self.assertEqual(len(results), 3)
-    
-    def test_query_with_filter(self):
-        """Testa a consulta com filtro"""
-        results = self.data_product.query({"id": "001"})
-        self.assertEqual(len(results), 1)
-        self.assertEqual(results[0]["value"], 100)
+    def test_query_all_returns_copies(self):
+        """Testa se a consulta sem filtros retorna cópias, independentes dos registros armazenados"""
+        all_data = self.data_product.query()
+        all_data[0]["id"] = "999"
+        self.assertEqual(self.data_product._data_store[0]["id"], "001")
+        self.assertEqual(len(self.data_product.query({"id": "001"})), 1)
+        self.assertEqual(self.data_product.query({"id": "999"}), [])
+
+    def test_query_all_returns_snapshot(self):
+        """Testa se a consulta sem filtros retorna um snapshot imutável, reaproveitado até a próxima alteração"""
+        snapshot = self.data_product.query()
+        self.assertIsInstance(snapshot, tuple)
+        self.assertIs(self.data_product.query(), snapshot)
+        self.data_product.add_data({"id": "004", "value": 250, "name": "Item D"})
+        self.assertEqual(len(snapshot), 3)
+        refreshed = self.data_product.query()
+        self.assertIsNot(refreshed, snapshot)
+        self.assertEqual(len(refreshed), 4)
+
+    def test_mutating_query_results_keeps_indexes_consistent(self):
+        """Testa se alterar um resultado de consulta não corrompe os índices"""
+        item = {"id": "004", "value": 250, "name": "Item D"}
+        self.data_product.add_data(item)
+        item["id"] = "005"
+        self.data_product.query({"id": "004"})[0]["id"] = "006"
+        self.assertEqual(len(self.data_product.query({"id": "004"})), 1)
+        self.assertEqual(self.data_product.query({"id": "005"}), [])
+        self.assertEqual(self.data_product.query({"id": "006"}), [])
+        self.assertEqual(sorted(row["id"] for row in self.data_product.query()), ["001", "002", "003", "004"])
+
+    def test_query_cache_not_affected_by_result_mutation(self):
+        """Testa se alterar o resultado de uma consulta memorizada não altera as seguintes"""
+        first = self.data_product.query({"id": "001"})
+        first[0]["value"] = -1
+        first.clear()
+        second = self.data_product.query({"id": "001"})
+        self.assertEqual(second, [{"id": "001", "value": 100, "name": "Item A"}])
+        second[0]["name"] = "Item Z"
+        self.assertEqual(self.data_product.query({"id": "001"})[0]["name"], "Item A")
+
+    def test_filter_predicate_compiled_per_sorted_residual_fields(self):
+        """Testa se o predicado é compilado por campos ordenados, sem o termo já resolvido pelo índice"""
+        _compile_filter.cache_clear()
+        find = self.data_product._find_positions
+        self.assertEqual(find({"value": 200, "name": "Item B"}), [1])
+        self.assertEqual(find({"name": "Item B", "value": 200}), [1])
+        self.assertEqual(_compile_filter.cache_info().misses, 1)
+        self.assertEqual(find({"id": "002"}), [1])
+        self.assertEqual(_compile_filter.cache_info().misses, 1)
+        self.assertEqual(find({"id": "002", "name": "Item A"}), [])
+        self.assertEqual(find({"name": "Item B", "id": "002"}), [1])
+        self.assertEqual(_compile_filter.cache_info().misses, 2)
+
+    def test_query_cache_invalidated_on_change(self):
+        """Testa se consultas memorizadas são invalidadas quando os dados mudam"""
+        first = self.data_product.query({"name": "Item D"})
+        self.assertEqual(first, [])
+        self.data_product.add_data({"id": "004", "value": 250, "name": "Item D"})
+        self.assertEqual(len(self.data_product.query({"name": "Item D"})), 1)
+
+        cached = self.data_product.query({"name": "Item D"})
+        cached.clear()  # Alterar o resultado não deve afetar o cache
+        self.assertEqual(len(self.data_product.query({"name": "Item D"})), 1)
 
-        results_no_match = self.data_product.query({"id": "999"})
-        self.assertEqual(len(results_no_match), 0)
-    
     def test_update_existing_data(self):
         """Testa a atualização de dados existentes"""
         updated_count = self.data_product.update_data({"id": "001"}, {"value": 120, "name": "Updated Item A"})
@@ -154,6 +242,33 @@ class TestDomainDataProduct(unittest.TestCase):
         original_record = self.data_product.query({"id": "001"})[0]
         self.assertEqual(original_record["value"], 100)
 
+    def test_indexes_follow_update_and_remove(self):
+        """Testa se consultas pela chave primária refletem atualizações e remoções"""
+        self.data_product.update_data({"id": "001"}, {"id": "010"})
+        self.assertEqual(self.data_product.query({"id": "001"}), [])
+        self.assertEqual(self.data_product.query({"id": "010"})[0]["name"], "Item A")
+
+        self.data_product.remove_data({"id": "002"})
+        self.assertEqual(self.data_product.query({"id": "003"})[0]["value"], 150)
+        self.assertEqual(self.data_product.query({"id": "010", "value": 999}), [])
+
+    def test_indexed_operations_at_scale(self):
+        """Testa query/update/remove pela chave primária com volumes crescentes de dados"""
+        for size in (3, 100, 10_000):
+            with self.subTest(size=size):
+                product = DomainDataProduct(self.metadata, self.schema, self.sla)
+                product.add_many(
+                    [{"id": f"{i:06d}", "value": i, "name": f"n{i}"} for i in range(size)],
+                    validate=False
+                )
+                last_id = f"{size - 1:06d}"
+                self.assertEqual(product.query({"id": last_id})[0]["value"], size - 1)
+                self.assertEqual(product.update_data({"id": last_id}, {"value": -1}), 1)
+                self.assertEqual(product.query({"value": -1})[0]["id"], last_id)
+                self.assertEqual(product.remove_data({"id": "000000"}), 1)
+                self.assertEqual(len(product.query()), size - 1)
+                self.assertEqual(product.query({"id": last_id})[0]["value"], -1)
+
     def test_remove_existing_data(self):
         """Testa a remoção de dados existentes"""
         removed_count = self.data_product.remove_data({"id": "002"})
@@ -172,9 +287,50 @@ class TestDomainDataProduct(unittest.TestCase):
         self.data_product.query()
         metrics = self.data_product.get_metrics()
         self.assertEqual(metrics["total_records"], 3)
-        self.assertGreaterEqual(metrics["total_accesses"], 1) # Pode ter sido chamado pelo setUp ou outros testes
+        self.assertEqual(metrics["total_accesses"], 1)
         self.assertEqual(metrics["status"], "draft")
     
+    def test_access_logging(self):
+        """Testa se os acessos são registrados"""
+        self.data_product.query()
+        self.data_product.query({"id": "001"})
+        
+        self.assertEqual(self.data_product._access_count, 2)
+        self.assertEqual(self.data_product._last_operation, "query")
+        self.assertEqual(len(self.data_product._access_log), 2)
+
+
+class TestDomainDataProductReadOnly(unittest.TestCase):
+    """Testes de DomainDataProduct que apenas leem: compartilham uma única instância"""
+    
+    @classmethod
+    def setUpClass(cls):
+        cls.data_product = _make_product(*_make_schema_and_sla())
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.data_product = None
+    
+    def test_initialization(self):
+        """Testa se o Data Product é inicializado corretamente"""
+        self.assertEqual(self.data_product.metadata.name, "test-product")
+        self.assertEqual(self.data_product.metadata.status, DataProductStatus.DRAFT)
+        self.assertEqual(len(self.data_product._data_store), 3)
+    
+    def test_query_all_data(self):
+        """Testa a consulta de todos os dados"""
+        results = self.data_product.query()
+        self.assertEqual(len(results), 3)
+    
+    def test_query_with_filter(self):
+        """Testa a consulta com filtro"""
+        results = self.data_product.query({"id": "001"})
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]["value"], 100)
+
+        results_no_match = self.data_product.query({"id": "999"})
+        self.assertEqual(len(results_no_match), 0)
+    
     def test_get_lineage(self):
         """Testa a obtenção de linhagem"""
         lineage = self.data_product.get_lineage()
@@ -183,15 +339,15 @@ class TestDomainDataProduct(unittest.TestCase):
         self.assertEqual(lineage["domain"], "test-domain")
         self.assertIsInstance(lineage["upstream_dependencies"], list)
         self.assertIsInstance(lineage["downstream_consumers"], list)
-    
-    def test_access_logging(self):
-        """Testa se os acessos são registrados"""
-        initial_log_count = len(self.data_product._access_log)
-        self.data_product.query()
-        self.data_product.query({"id": "001"})
-        
-        self.assertEqual(len(self.data_product._access_log), initial_log_count + 2)
-        self.assertEqual(self.data_product._access_log[-2]["operation"], "query")
+
+
+# Vendas válidas compartilhadas pelos testes; a primeira é a base dos casos de validação
+_SALES_ROWS = (
+    {"transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1", "amount": 100.00, "date": "2025-01-01", "product_category": "Electronics", "region": "NA"},
+    {"transaction_id": "TXN002", "product_id": "P2", "customer_id": "C2", "amount": 200.00, "date": "2025-01-02", "product_category": "Books", "region": "EU"},
+    {"transaction_id": "TXN003", "product_id": "P1", "customer_id": "C1", "amount": 150.00, "date": "2025-01-03", "product_category": "Electronics", "region": "NA"}
+)
+_MISSING = object()  # Marca um campo a ser removido do registro
 
 
 class TestSalesDataProduct(unittest.TestCase):
@@ -203,43 +359,45 @@ class TestSalesDataProduct(unittest.TestCase):
             owner="Sales Team"
         )
 
+    def tearDown(self):
+        self.sales_product = None
+
     def test_initialization(self):
         self.assertEqual(self.sales_product.metadata.name, "Test Sales")
         self.assertEqual(self.sales_product.metadata.domain, "Sales")
         self.assertEqual(self.sales_product.metadata.quality_level, DataQualityLevel.SILVER)
 
+    def _preload(self, rows):
+        """Carrega registros já sabidamente válidos, sem repetir a validação"""
+        self.sales_product.add_many([dict(row) for row in rows], validate=False)
+
     def test_add_valid_sale(self):
-        sale_data = {
-            "transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1",
-            "amount": 100.00, "date": "2025-01-01", "product_category": "Electronics", "region": "NA"
-        }
-        self.assertTrue(self.sales_product.add_data(sale_data))
+        self.assertTrue(self.sales_product.add_data(dict(_SALES_ROWS[0])))
         self.assertEqual(len(self.sales_product._data_store), 1)
-        self.assertAlmostEqual(self.sales_product.get_sales_metrics()["total_revenue"], 100.00)
-
-    def test_add_invalid_sale_missing_field(self):
-        sale_data = {
-            "transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1",
-            "amount": 100.00, "date": "2025-01-01", "region": "NA" # Missing product_category
-        }
-        self.assertFalse(self.sales_product.add_data(sale_data))
-        self.assertEqual(len(self.sales_product._data_store), 0)
-
-    def test_add_invalid_sale_wrong_amount_type(self):
-        sale_data = {
-            "transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1",
-            "amount": "invalid", "date": "2025-01-01", "product_category": "Electronics", "region": "NA"
-        }
-        self.assertFalse(self.sales_product.add_data(sale_data))
-        self.assertEqual(len(self.sales_product._data_store), 0)
-
-    def test_add_invalid_sale_negative_amount(self):
-        sale_data = {
-            "transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1",
-            "amount": -10.00, "date": "2025-01-01", "product_category": "Electronics", "region": "NA"
-        }
-        self.assertFalse(self.sales_product.add_data(sale_data))
-        self.assertEqual(len(self.sales_product._data_store), 0)
+        self.assertEqual(self.sales_product.get_sales_metrics()["total_revenue"], 100.00)
+
+    def test_add_invalid_sale(self):
+        """Testa a rejeição de vendas inválidas (um caso por tipo de problema)"""
+        cases = [
+            ("missing_field", {"product_category": _MISSING}),
+            ("wrong_amount_type", {"amount": "invalid"}),
+            ("negative_amount", {"amount": -10.00}),
+            ("invalid_date", {"date": "2025-13-01"})
+        ]
+        for label, changes in cases:
+            with self.subTest(label):
+                sale_data = {k: v for k, v in {**_SALES_ROWS[0], **changes}.items() if v is not _MISSING}
+                self.assertFalse(self.sales_product.add_data(sale_data))
+                self.assertEqual(len(self.sales_product._data_store), 0)
+
+    def test_sale_without_numeric_amount_rejected_without_validation(self):
+        for label, changes in (("missing_amount", {"amount": _MISSING}), ("text_amount", {"amount": "100"})):
+            with self.subTest(label):
+                sale_data = {k: v for k, v in {**_SALES_ROWS[0], **changes}.items() if v is not _MISSING}
+                self.assertFalse(self.sales_product.add_data(dict(sale_data), validate=False))
+                self.assertEqual(self.sales_product.add_many([dict(sale_data)], validate=False), (0, 1))
+                self.assertEqual(len(self.sales_product._data_store), 0)
+                self.assertEqual(self.sales_product.get_sales_metrics()["total_transactions"], 0)
 
     def test_add_invalid_sale_duplicate_transaction_id(self):
         sale_data1 = {
@@ -251,39 +409,88 @@ class TestSalesDataProduct(unittest.TestCase):
             "amount": 200.00, "date": "2025-01-02", "product_category": "Books", "region": "EU"
         }
         self.assertTrue(self.sales_product.add_data(sale_data1))
-        self.assertFalse(self.sales_product.add_data(sale_data2)) # Should fail due to duplicate ID
+        with self.assertLogs("src.sales_data_product", level="WARNING") as logs:
+            self.assertFalse(self.sales_product.add_data(sale_data2)) # Should fail due to duplicate ID
+        self.assertIn("TXN001 já existe", logs.output[0])
         self.assertEqual(len(self.sales_product._data_store), 1)
 
-    def test_get_sales_metrics(self):
+    def test_add_many_sales(self):
         sales_data = [
             {"transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1", "amount": 100.00, "date": "2025-01-01", "product_category": "Electronics", "region": "NA"},
-            {"transaction_id": "TXN002", "product_id": "P2", "customer_id": "C2", "amount": 200.00, "date": "2025-01-02", "product_category": "Books", "region": "EU"},
+            {"transaction_id": "TXN001", "product_id": "P2", "customer_id": "C2", "amount": 200.00, "date": "2025-01-02", "product_category": "Books", "region": "EU"},
+            {"transaction_id": "TXN002", "product_id": "P2", "customer_id": "C2", "amount": -5.00, "date": "2025-01-02", "product_category": "Books", "region": "EU"},
             {"transaction_id": "TXN003", "product_id": "P1", "customer_id": "C1", "amount": 150.00, "date": "2025-01-03", "product_category": "Electronics", "region": "NA"}
         ]
-        for sale in sales_data:
-            self.sales_product.add_data(sale)
-        
+        self.assertEqual(self.sales_product.add_many(sales_data), (2, 2))
+        self.assertEqual(len(self.sales_product.query({"customer_id": "C1"})), 2)
+        self.assertEqual(self.sales_product.get_sales_metrics()["total_revenue"], 250.00)
+
+    def test_get_sales_metrics(self):
+        self._preload(_SALES_ROWS)
         metrics = self.sales_product.get_sales_metrics()
-        self.assertAlmostEqual(metrics["total_revenue"], 450.00)
+        self.assertEqual(metrics["total_revenue"], 450.00)
         self.assertEqual(metrics["total_transactions"], 3)
-        self.assertAlmostEqual(metrics["average_transaction_value"], 150.00)
+        self.assertEqual(metrics["average_transaction_value"], 150.00)
         self.assertEqual(metrics["sales_by_category"]["Electronics"], 250.00)
         self.assertEqual(metrics["sales_by_region"]["NA"], 250.00)
 
-    def test_get_data_quality_report(self):
+    def test_sales_metrics_follow_update_and_remove(self):
+        self._preload(_SALES_ROWS[:2])
+        self.sales_product.update_data({"transaction_id": "TXN001"}, {"amount": 150.00, "region": "EU"})
+        metrics = self.sales_product.get_sales_metrics()
+        self.assertEqual(metrics["total_revenue"], 350.00)
+        self.assertEqual(metrics["sales_by_region"], {"EU": 350.00})
+
+        self.sales_product.remove_data({"transaction_id": "TXN002"})
+        metrics = self.sales_product.get_sales_metrics()
+        self.assertEqual(metrics["total_transactions"], 1)
+        self.assertNotIn("Books", metrics["sales_by_category"])
+        self.assertEqual(metrics["top_customers_by_revenue"], [("C1", 150.00)])
+
+    def test_sales_metrics_are_exact_in_cents(self):
         sales_data = [
-            {"transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1", "amount": 100.00, "date": "2025-01-01", "product_category": "Electronics", "region": "NA"},
-            {"transaction_id": "TXN002", "product_id": "P2", "customer_id": "C2", "amount": 200.00, "date": "2025-01-02", "product_category": "Books", "region": "EU"}
+            {"transaction_id": "TXN001", "product_id": "P1", "customer_id": "C1", "amount": 0.10, "date": "2025-01-01", "product_category": "Books", "region": "EU"},
+            {"transaction_id": "TXN002", "product_id": "P2", "customer_id": "C1", "amount": 0.20, "date": "2025-01-02", "product_category": "Books", "region": "EU"},
+            {"transaction_id": "TXN003", "product_id": "P3", "customer_id": "C2", "amount": 19.99, "date": "2025-01-03", "product_category": "Books", "region": "EU"}
         ]
-        for sale in sales_data:
-            self.sales_product.add_data(sale)
-        
+        self.sales_product.add_many(sales_data)
+        self.assertEqual(self.sales_product.get_sales_metrics()["sales_by_category"], {"Books": 20.29})
+
+        self.sales_product.remove_data({"transaction_id": "TXN003"})
+        metrics = self.sales_product.get_sales_metrics()
+        self.assertEqual(metrics["sales_by_region"], {"EU": 0.30})
+        self.assertEqual(metrics["top_customers_by_revenue"], [("C1", 0.30)])
+
+    def test_get_data_quality_report(self):
+        self._preload(_SALES_ROWS[:2])
         report = self.sales_product.get_data_quality_report()
         self.assertEqual(report["total_records"], 2)  # Only valid records added
         # Since both records are valid, all metrics should be 100%
         self.assertEqual(float(report["date_format_validity"]["rate"].replace("%", "")), 100.00)
         self.assertTrue(report["overall_completeness_meets_sla"])
 
+    def test_data_quality_report_refreshes_after_changes(self):
+        self._preload(_SALES_ROWS[:1])
+        first = self.sales_product.get_data_quality_report()
+        first["total_records"] = 99  # Alterar a cópia retornada não afeta o cache
+        first["date_format_validity"]["invalid_records"] = 99
+        first["completeness_by_field"]["amount"] = 0.0
+        second = self.sales_product.get_data_quality_report()
+        self.assertEqual(second["total_records"], 1)
+        self.assertEqual(second["date_format_validity"]["invalid_records"], 0)
+        self.assertEqual(second["completeness_by_field"]["amount"], 100.0)
+
+        self.sales_product.update_data({"transaction_id": "TXN001"}, {"date": ""})
+        report = self.sales_product.get_data_quality_report()
+        self.assertEqual(report["date_format_validity"]["invalid_records"], 1)
+
+
+# Clientes válidos compartilhados pelos testes
+_CUSTOMER_ROWS = (
+    {"customer_id": "CUST001", "name": "John Doe", "email": "john.doe@example.com", "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver", "last_interaction": "2025-10-01 10:00:00"},
+    {"customer_id": "CUST002", "name": "Jane Doe", "email": "jane.doe@example.com", "registration_date": "2024-01-02", "lifetime_value": 2000.00, "tier": "gold", "last_interaction": "2025-10-02 11:00:00"}
+)
+
 
 class TestCustomerDataProduct(unittest.TestCase):
     """Testes para a classe CustomerDataProduct"""
@@ -294,6 +501,13 @@ class TestCustomerDataProduct(unittest.TestCase):
             owner="CX Team"
         )
 
+    def tearDown(self):
+        self.customer_product = None
+
+    def _preload(self, rows):
+        """Carrega registros já sabidamente válidos, sem repetir a validação"""
+        self.customer_product.add_many([dict(row) for row in rows], validate=False)
+
     def test_initialization(self):
         self.assertEqual(self.customer_product.metadata.name, "Test Customer 360")
         self.assertEqual(self.customer_product.metadata.domain, "Customer")
@@ -325,6 +539,15 @@ class TestCustomerDataProduct(unittest.TestCase):
         self.assertFalse(self.customer_product.add_data(customer_data))
         self.assertEqual(len(self.customer_product._data_store), 0)
 
+    def test_add_invalid_customer_email_with_two_at_signs(self):
+        customer_data = {
+            "customer_id": "CUST001", "name": "John Doe", "email": "john@doe@example.com",
+            "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver",
+            "last_interaction": "2025-10-01 10:00:00"
+        }
+        self.assertFalse(self.customer_product.add_data(customer_data))
+        self.assertEqual(len(self.customer_product._data_store), 0)
+
     def test_add_invalid_customer_duplicate_id(self):
         customer_data1 = {
             "customer_id": "CUST001", "name": "John Doe", "email": "john.doe@example.com",
@@ -340,38 +563,97 @@ class TestCustomerDataProduct(unittest.TestCase):
         self.assertFalse(self.customer_product.add_data(customer_data2)) # Should fail due to duplicate ID
         self.assertEqual(len(self.customer_product._data_store), 1)
 
-    def test_create_and_get_segment(self):
-        customer_data1 = {
+    def test_customer_id_reusable_after_remove(self):
+        customer_data = {
             "customer_id": "CUST001", "name": "John Doe", "email": "john.doe@example.com",
             "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver",
             "last_interaction": "2025-10-01 10:00:00"
         }
-        customer_data2 = {
-            "customer_id": "CUST002", "name": "Jane Doe", "email": "jane.doe@example.com",
-            "registration_date": "2024-01-02", "lifetime_value": 2000.00, "tier": "gold",
-            "last_interaction": "2025-10-02 11:00:00"
-        }
-        self.customer_product.add_data(customer_data1)
-        self.customer_product.add_data(customer_data2)
+        self.assertTrue(self.customer_product.add_data(customer_data))
+        self.assertEqual(self.customer_product.remove_data({"customer_id": "CUST001"}), 1)
+        self.assertTrue(self.customer_product.add_data(dict(customer_data)))
+        self.assertEqual(len(self.customer_product._data_store), 1)
 
+    def test_create_and_get_segment(self):
+        self._preload(_CUSTOMER_ROWS)
         self.customer_product.create_segment("gold_tier", lambda c: c.get("tier") == "gold")
         gold_customers = self.customer_product.get_segment("gold_tier")
         self.assertEqual(len(gold_customers), 1)
         self.assertIn("CUST002", gold_customers)
 
-    def test_get_segment_statistics(self):
-        customer_data1 = {
+    def test_segments_follow_data_changes(self):
+        self.customer_product.create_segment("gold_tier", lambda c: c.get("tier") == "gold")
+        self.customer_product.add_data({
             "customer_id": "CUST001", "name": "John Doe", "email": "john.doe@example.com",
             "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver",
             "last_interaction": "2025-10-01 10:00:00"
-        }
-        customer_data2 = {
+        })
+        self.customer_product.add_data({
             "customer_id": "CUST002", "name": "Jane Doe", "email": "jane.doe@example.com",
             "registration_date": "2024-01-02", "lifetime_value": 2000.00, "tier": "gold",
             "last_interaction": "2025-10-02 11:00:00"
+        })
+        self.assertEqual(self.customer_product.get_segment("gold_tier"), ["CUST002"])
+
+        self.customer_product.update_data({"customer_id": "CUST001"}, {"tier": "gold"})
+        self.assertEqual(sorted(self.customer_product.get_segment("gold_tier")), ["CUST001", "CUST002"])
+        self.assertTrue(self.customer_product.is_in_segment("gold_tier", "CUST001"))
+        self.customer_product.create_segment("high_ltv", lambda c: c["lifetime_value"] > 1500)
+        self.assertEqual(self.customer_product.intersect_segments("gold_tier", "high_ltv"), ["CUST002"])
+
+        self.customer_product.update_data({"customer_id": "CUST002"}, {"tier": "silver"})
+        self.customer_product.remove_data({"customer_id": "CUST001"})
+        self.assertEqual(self.customer_product.get_segment("gold_tier"), [])
+
+    def test_unhashable_indexed_value_rejected_without_validation(self):
+        self._preload(_CUSTOMER_ROWS[:1])
+        before = self.customer_product.query({"tier": _CUSTOMER_ROWS[0]["tier"]})
+        invalid = dict(_CUSTOMER_ROWS[1], customer_id=["CUST002"], tier=_CUSTOMER_ROWS[0]["tier"])
+        self.assertFalse(self.customer_product.add_data(dict(invalid), validate=False))
+        self.assertEqual(self.customer_product.add_many([dict(invalid)], validate=False), (0, 1))
+        self.assertEqual(len(self.customer_product._data_store), 1)
+        self.assertEqual(self.customer_product.query({"tier": _CUSTOMER_ROWS[0]["tier"]}), before)
+
+    def test_rejected_customer_leaves_no_cached_interaction(self):
+        invalid = {
+            "customer_id": "CUST001", "name": 123, "email": "john.doe@example.com",
+            "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver",
+            "last_interaction": "2025-10-01 10:00:00"
+        }
+        self.assertFalse(self.customer_product.add_data(dict(invalid)))
+        self.assertEqual(self.customer_product.add_many([dict(invalid)]), (0, 1))
+        self.assertEqual(self.customer_product._interaction_times, {})
+
+    def test_get_last_interaction_of_unstored_customer_not_cached(self):
+        customer = dict(_CUSTOMER_ROWS[0])
+        self.assertEqual(self.customer_product.get_last_interaction(customer), datetime(2025, 10, 1, 10, 0, 0))
+        self.assertEqual(self.customer_product._interaction_times, {})
+
+    def test_get_last_interaction_follows_updates(self):
+        customer_data = {
+            "customer_id": "CUST001", "name": "John Doe", "email": "john.doe@example.com",
+            "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver",
+            "last_interaction": "2025-10-01 10:00:00"
         }
-        self.customer_product.add_data(customer_data1)
-        self.customer_product.add_data(customer_data2)
+        self.customer_product.add_data(customer_data)
+        self.assertEqual(self.customer_product.get_last_interaction(customer_data), datetime(2025, 10, 1, 10, 0, 0))
+        self.customer_product.update_data({"customer_id": "CUST001"}, {"last_interaction": "2025-10-07 08:30:00"})
+        updated = self.customer_product.query({"customer_id": "CUST001"})[0]
+        self.assertEqual(self.customer_product.get_last_interaction(updated), datetime(2025, 10, 7, 8, 30, 0))
+
+    def test_mutating_query_results_keeps_tier_index_consistent(self):
+        self._preload(_CUSTOMER_ROWS)
+        silver = self.customer_product.query({"tier": "silver"})
+        gold_count = len(self.customer_product.query({"tier": "gold"}))
+        silver[0]["tier"] = "gold"
+        self.assertEqual(len(self.customer_product.query({"tier": "silver"})), len(silver))
+        self.assertEqual(len(self.customer_product.query({"tier": "gold"})), gold_count)
+        self.assertEqual(
+            sum(1 for row in self.customer_product.query() if row["tier"] == "silver"), len(silver)
+        )
+
+    def test_get_segment_statistics(self):
+        self._preload(_CUSTOMER_ROWS)
         self.customer_product.create_segment("gold_tier", lambda c: c.get("tier") == "gold")
 
         stats = self.customer_product.get_segment_statistics()
@@ -380,12 +662,7 @@ class TestCustomerDataProduct(unittest.TestCase):
         self.assertEqual(stats["segments"]["gold_tier"]["customer_count"], 1)
 
     def test_get_data_quality_report(self):
-        customer_data = [
-            {"customer_id": "CUST001", "name": "John Doe", "email": "john.doe@example.com", "registration_date": "2024-01-01", "lifetime_value": 1000.00, "tier": "silver", "last_interaction": "2025-10-01 10:00:00"}
-        ]
-        for cust in customer_data:
-            self.customer_product.add_data(cust)
-        
+        self._preload(_CUSTOMER_ROWS[:1])
         report = self.customer_product.get_data_quality_report()
         self.assertEqual(report["total_records"], 1)  # Only valid record added
         # Since the record is valid, all metrics should be 100%
@@ -433,24 +710,46 @@ class TestDataSchema(unittest.TestCase):
         self.assertEqual(schema.primary_key, "id")
         self.assertEqual(len(schema.indexes), 1)
 
+    def test_schema_serializable_with_asdict(self):
+        """Testa se o validador compilado não aparece em asdict (schema serializável em JSON)"""
+        schema = DataSchema(fields={"id": "string", "value": "integer"}, primary_key="id")
+        self.assertEqual(
+            json.loads(json.dumps(asdict(schema))),
+            {"fields": {"id": "string", "value": "integer"}, "primary_key": "id", "indexes": []}
+        )
+
+    def test_validator_follows_schema_field_changes(self):
+        """Testa se o validador é recompilado quando os campos do schema mudam"""
+        schema = DataSchema(fields={"id": "string"}, primary_key="id")
+        self.assertTrue(schema._validator({"id": "1"}))
+        schema.fields["n"] = "integer"
+        self.assertFalse(schema._validator({"id": "1"}))
+        self.assertTrue(schema._validator({"id": "1", "n": 2}))
+        self.assertEqual(schema._field_types, {"id": str, "n": int})
+        schema.fields = {"id": "integer"}
+        self.assertTrue(schema._validator({"id": 1}))
+
+    def test_recompile_after_field_type_change(self):
+        """Testa a recompilação explícita após alterar o tipo de um campo existente"""
+        schema = DataSchema(fields={"id": "string", "n": "integer"}, primary_key="id")
+        schema.fields["n"] = "string"
+        schema.recompile()
+        self.assertTrue(schema._validator({"id": "1", "n": "2"}))
+        self.assertFalse(schema._validator({"id": "1", "n": 2}))
+        self.assertEqual(schema._field_types, {"id": str, "n": str})
+
+    def test_compiled_validator_shared_between_schemas(self):
+        """Testa se schemas com os mesmos campos compartilham o validador compilado"""
+        schema_a = DataSchema(fields={"id": "string", "value": "integer"})
+        schema_b = DataSchema(fields={"value": "integer", "id": "string"})
+        self.assertIs(schema_a._validator, schema_b._validator)
+        self.assertTrue(schema_a._validator({"id": "1", "value": 10}))
+        self.assertFalse(schema_a._validator({"id": "1", "value": "10"}))
+        self.assertFalse(schema_a._validator({"id": "1"}))
+
 
 if __name__ == "__main__":
     print("=" * 80)
     print("Executando testes do Data Mesh Implementation Framework")
     print("=" * 80)
-    # Criar um TextTestRunner com verbosity=2 para ver detalhes dos testes
-    runner = unittest.TextTestRunner(verbosity=2)
-    # Criar uma suíte de testes e adicionar todos os testes de cada classe
-    suite = unittest.TestSuite()
-    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestDomainDataProduct))
-    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestSalesDataProduct))
-    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestCustomerDataProduct))
-    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestDataProductMetadata))
-    suite.addTest(unittest.TestLoader().loadTestsFromTestCase(TestDataSchema))
-    
-    # Executar a suíte de testes
-    result = runner.run(suite)
-    
-    # Sair com código de erro se algum teste falhar
-    sys.exit(0 if result.wasSuccessful() else 1)
-
+    unittest.main(buffer=True)
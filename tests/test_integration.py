@@ -1,46 +1,57 @@
 import unittest
-import sys
 import os
+import sys
 import json
-from datetime import datetime
+import tempfile
+from unittest.mock import patch
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+# Execução direta (python tests/<arquivo>.py): sem o conftest.py do pytest,
+# a raiz do projeto precisa ser adicionada ao path para importar o pacote src
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-from src.domain_data_product import DomainDataProduct, DataProductStatus
 from src.sales_data_product import SalesDataProduct
 from src.customer_data_product import CustomerDataProduct
 
 class TestIntegration(unittest.TestCase):
     """Testes de integração entre os Data Products"""
 
-    def setUp(self):
-        self.sales_product = SalesDataProduct(name="Integration Sales", owner="Integration Team")
-        self.customer_product = CustomerDataProduct(name="Integration Customer", owner="Integration Team")
-        
-        self.sales_data = [
+    @classmethod
+    def setUpClass(cls):
+        """Grava os arquivos de fixture uma única vez para toda a classe"""
+        cls.sales_data = [
             {"transaction_id": "TXN100", "product_id": "P1", "customer_id": "C10", "amount": 100.0, "date": "2025-01-01", "product_category": "Electronics", "region": "NA"},
             {"transaction_id": "TXN101", "product_id": "P2", "customer_id": "C11", "amount": 200.0, "date": "2025-01-02", "product_category": "Books", "region": "EU"}
         ]
         
-        self.customer_data = [
+        cls.customer_data = [
             {"customer_id": "C10", "name": "Integ John", "email": "integ.john@example.com", "registration_date": "2024-01-01", "lifetime_value": 100.0, "tier": "silver", "last_interaction": "2025-01-01 10:00:00"},
             {"customer_id": "C11", "name": "Integ Jane", "email": "integ.jane@example.com", "registration_date": "2024-01-02", "lifetime_value": 200.0, "tier": "gold", "last_interaction": "2025-01-02 11:00:00"}
         ]
 
-        self.sales_file = "test_sales.json"
-        self.customers_file = "test_customers.json"
+        # Documentos JSON em memória (load_data_from_bytes) e gravados em disco (load_data_from_json)
+        cls.sales_bytes = json.dumps(cls.sales_data).encode()
+        cls.customers_bytes = json.dumps(cls.customer_data).encode()
+
+        # Diretório temporário removido de uma só vez em tearDownClass
+        cls._tmpdir = tempfile.TemporaryDirectory()
+        cls.sales_file = os.path.join(cls._tmpdir.name, "test_sales.json")
+        cls.customers_file = os.path.join(cls._tmpdir.name, "test_customers.json")
 
-        with open(self.sales_file, 'w') as f:
-            json.dump(self.sales_data, f)
+        with open(cls.sales_file, 'wb') as f:
+            f.write(cls.sales_bytes)
         
-        with open(self.customers_file, 'w') as f:
-            json.dump(self.customer_data, f)
+        with open(cls.customers_file, 'wb') as f:
+            f.write(cls.customers_bytes)
 
-    def tearDown(self):
-        if os.path.exists(self.sales_file):
-            os.remove(self.sales_file)
-        if os.path.exists(self.customers_file):
-            os.remove(self.customers_file)
+    @classmethod
+    def tearDownClass(cls):
+        cls._tmpdir.cleanup()
+
+    def setUp(self):
+        # Produtos novos a cada teste; os arquivos (somente leitura) são compartilhados
+        self.sales_product = SalesDataProduct(name="Integration Sales", owner="Integration Team")
+        self.customer_product = CustomerDataProduct(name="Integration Customer", owner="Integration Team")
 
     def test_load_data_from_json(self):
         """Testa o carregamento de dados a partir de arquivos JSON"""
@@ -51,12 +62,40 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(customers_loaded, 2)
         self.assertEqual(len(self.sales_product._data_store), 2)
         self.assertEqual(len(self.customer_product._data_store), 2)
-        self.assertAlmostEqual(self.sales_product.get_sales_metrics()["total_revenue"], 300.0)
+        self.assertEqual(self.sales_product.get_sales_metrics()["total_revenue"], 300.0)
+
+    def test_load_data_from_bytes(self):
+        """Testa o carregamento de dados a partir de um documento JSON em memória"""
+        self.assertEqual(self.sales_product.load_data_from_bytes(self.sales_bytes), 2)
+        self.assertEqual(self.sales_product.load_data_from_bytes(b'{"not": "a list"}'), 0)
+        self.assertEqual(self.customer_product.load_data_from_bytes(b'[{"customer_id": '), 0)
+        self.assertEqual(len(self.customer_product._data_store), 0)
+
+    def test_load_logs_a_single_summary(self):
+        """Testa se cada carga gera uma única mensagem de resumo"""
+        with self.assertLogs("src.domain_data_product", level="INFO") as logs:
+            self.sales_product.load_data_from_bytes(self.sales_bytes)
+        summaries = [line for line in logs.output if "✓" in line]
+        self.assertEqual(len(summaries), 1)
+        self.assertIn("2 de 2 registros carregados", summaries[0])
+
+    def test_loading_data_is_not_a_consumer_access(self):
+        """Testa se carregar dados (como add_data) não conta como acesso de consumidor"""
+        self.sales_product.load_data_from_bytes(self.sales_bytes)
+        self.sales_product.load_data_from_json(self.sales_file)
+        self.assertEqual(self.sales_product.get_metrics()["total_accesses"], 0)
+        self.assertEqual(self.sales_product._access_log, [])
+
+    def test_load_data_without_orjson(self):
+        """Testa o carregamento pelo json da stdlib (orjson é opcional, p. ex. no PyPy)"""
+        with patch("src.domain_data_product.orjson", None):
+            self.assertEqual(self.sales_product.load_data_from_json(self.sales_file), 2)
+            self.assertEqual(self.customer_product.load_data_from_bytes(b'[{"customer_id": '), 0)
 
     def test_data_product_interaction_and_lineage(self):
         """Testa a interação e a linhagem entre Sales e Customer Data Products"""
-        self.sales_product.load_data_from_json(self.sales_file)
-        self.customer_product.load_data_from_json(self.customers_file)
+        self.sales_product.load_data_from_bytes(self.sales_bytes)
+        self.customer_product.load_data_from_bytes(self.customers_bytes)
 
         # Adicionar dependência
         self.sales_product.add_dependency(self.customer_product)
@@ -67,6 +106,8 @@ class TestIntegration(unittest.TestCase):
         customer_lineage = self.customer_product.get_lineage()
 
         self.assertIn("Integration Customer", sales_lineage["upstream_dependencies"])
+        self.sales_product.add_dependency(self.customer_product)  # Repetida: não duplica
+        self.assertEqual(self.sales_product.get_lineage()["upstream_dependencies"], ["Integration Customer"])
         self.assertIn("Integration Sales", customer_lineage["downstream_consumers"])
 
         # Exemplo de consulta que une informações (simulado)
@@ -75,7 +116,10 @@ class TestIntegration(unittest.TestCase):
         for sale in sales_records:
             customer = self.customer_product.query({"customer_id": sale["customer_id"]})
             if customer:
-                enriched_sale = {**sale, "customer_name": customer[0]["name"], "customer_tier": customer[0]["tier"]}
+                # copy() duplica a tabela hash sem recalcular as chaves (mais barato que {**sale, ...})
+                enriched_sale = sale.copy()
+                enriched_sale["customer_name"] = customer[0]["name"]
+                enriched_sale["customer_tier"] = customer[0]["tier"]
                 enriched_sales.append(enriched_sale)
         
         self.assertEqual(len(enriched_sales), 2)
@@ -83,5 +127,5 @@ class TestIntegration(unittest.TestCase):
         self.assertEqual(enriched_sales[1]["customer_tier"], "gold")
 
 if __name__ == '__main__':
-    unittest.main(verbosity=2)
+    unittest.main(buffer=True)
 